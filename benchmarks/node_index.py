@@ -0,0 +1,104 @@
+"""Node selection queries: linear scans over the node dict vs NodeIndex.
+
+Simulates a probe round on a large node list: each probe result changes one
+node's latency, then the questions the proxy and GUI ask are answered. The
+scan side does what NodeManager did before the index existed (min over all
+nodes, full sort for top-N); the index side updates incrementally and
+reads from the front of its sorted lists.
+
+    python benchmarks/node_index.py --nodes 1000 5000 20000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mtrproxy.node_index import NodeIndex, node_rank  # noqa: E402
+from mtrproxy.types import NodeInfo  # noqa: E402
+
+GROUPS = 20
+TOP_N = 8
+THRESHOLD_MS = 50.0
+
+
+def _nodes(count: int, rng: random.Random):
+    nodes = {}
+    for i in range(count):
+        node = NodeInfo(
+            hostname=f"node{i}",
+            ip=f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+            port=25565,
+            group=f"group{i % GROUPS}",
+            priority=rng.randint(1, 100),
+        )
+        _probe(node, rng)
+        nodes[node.hostname] = node
+    return nodes
+
+
+def _probe(node: NodeInfo, rng: random.Random) -> None:
+    node.reachable = rng.random() > 0.05
+    node.latency_ms = rng.uniform(5, 300) if node.reachable else None
+    node.effective_latency_ms = node.latency_ms
+
+
+def _scan_round(nodes, updates, rng):
+    for node in updates:
+        _probe(node, rng)
+        live = [n for n in nodes.values() if n.reachable and n.latency_ms is not None]
+        min(live, key=node_rank)
+        sorted(live, key=node_rank)[:TOP_N]
+        min((n for n in live if n.group == node.group), key=node_rank)
+        [n for n in live if node_rank(n) <= THRESHOLD_MS]
+
+
+def _index_round(index, updates, rng):
+    for node in updates:
+        _probe(node, rng)
+        index.update(node)
+        index.best()
+        index.top(TOP_N)
+        index.best(node.group)
+        index.within(THRESHOLD_MS)
+
+
+def measure(count: int, rounds: int):
+    rng = random.Random(count)
+    nodes = _nodes(count, rng)
+    updates = [rng.choice(list(nodes.values())) for _ in range(rounds)]
+
+    start = time.perf_counter()
+    _scan_round(nodes, updates, random.Random(1))
+    scan = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    index = NodeIndex()
+    index.replace(nodes.values())
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _index_round(index, updates, random.Random(1))
+    indexed = (time.perf_counter() - start) / rounds
+    return scan, indexed, build
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, nargs="*", default=[1000, 5000, 20000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8}{'scan us':>12}{'index us':>12}{'speedup':>10}{'build ms':>10}")
+    for count in args.nodes:
+        scan, indexed, build = measure(count, args.rounds)
+        print(
+            f"{count:>8}{scan * 1e6:>12.1f}{indexed * 1e6:>12.1f}"
+            f"{scan / indexed:>9.0f}x{build * 1e3:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Relay throughput benchmark: userspace copy loop vs. splice().
+
+Pushes a fixed amount of data source -> relay -> sink over loopback and
+reports throughput and the relay thread's CPU time per GB.
+
+    python benchmarks/relay_throughput.py --megabytes 1024
+"""
+import argparse
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mtrproxy.relay import SPLICE_AVAILABLE, BufferPool, forward_copy, forward_splice  # noqa: E402
+
+
+def _listener() -> socket.socket:
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(("127.0.0.1", 0))
+    s.listen(1)
+    return s
+
+
+def run_once(forward, total_bytes: int, pool: BufferPool) -> dict:
+    sink_listener = _listener()
+    relay_listener = _listener()
+
+    received = [0]
+
+    def sink() -> None:
+        conn, _ = sink_listener.accept()
+        buf = bytearray(1 << 20)
+        while True:
+            n = conn.recv_into(buf)
+            if not n:
+                break
+            received[0] += n
+        conn.close()
+
+    cpu = [0.0]
+
+    def relay() -> None:
+        client, _ = relay_listener.accept()
+        backend = socket.create_connection(sink_listener.getsockname())
+        start = time.thread_time()
+        forward(client, backend, pool)
+        cpu[0] = time.thread_time() - start
+        client.close()
+        backend.close()
+
+    sink_t = threading.Thread(target=sink)
+    relay_t = threading.Thread(target=relay)
+    sink_t.start()
+    relay_t.start()
+
+    src = socket.create_connection(relay_listener.getsockname())
+    chunk = b"\x00" * (1 << 20)
+    start = time.perf_counter()
+    sent = 0
+    while sent < total_bytes:
+        src.sendall(chunk)
+        sent += len(chunk)
+    src.shutdown(socket.SHUT_WR)
+    relay_t.join()
+    sink_t.join()
+    elapsed = time.perf_counter() - start
+    src.close()
+    sink_listener.close()
+    relay_listener.close()
+
+    gb = received[0] / (1 << 30)
+    return {
+        "bytes": received[0],
+        "seconds": elapsed,
+        "mb_per_s": received[0] / (1 << 20) / elapsed,
+        "cpu_s_per_gb": cpu[0] / gb if gb else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=512)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--buffer-size", type=int, default=65536)
+    args = parser.parse_args()
+    total = args.megabytes * (1 << 20)
+    pool = BufferPool(args.buffer_size)
+
+    modes = [("copy", forward_copy)]
+    if SPLICE_AVAILABLE:
+        modes.append(("splice", forward_splice))
+    else:
+        print("splice() not available on this platform, benchmarking copy only")
+
+    print(f"{'mode':<8}{'MB/s':>10}{'CPU s/GB':>12}")
+    for name, forward in modes:
+        best = None
+        for _ in range(args.rounds):
+            r = run_once(forward, total, pool)
+            if best is None or r["mb_per_s"] > best["mb_per_s"]:
+                best = r
+        print(f"{name:<8}{best['mb_per_s']:>10.1f}{best['cpu_s_per_gb']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
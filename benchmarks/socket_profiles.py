@@ -0,0 +1,131 @@
+"""Per-packet latency through ProxyServer for each socket profile.
+
+A client and an echo backend exchange small request/response pairs through
+the proxy on loopback. Each message goes out as two writes (a short header,
+then the body), the same way packetised game traffic does. That pattern
+makes Nagle's algorithm interact with delayed ACKs on the relay's sockets.
+Both endpoints set TCP_NODELAY themselves, so only the proxy's profile
+varies.
+
+    python benchmarks/socket_profiles.py --rounds 500
+"""
+import argparse
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mtrproxy.proxy_core import ProxyServer  # noqa: E402
+from mtrproxy.sockopts import SOCKET_PROFILES  # noqa: E402
+from mtrproxy.types import NodeInfo  # noqa: E402
+
+HEADER = b"\x40\x00\x00\x00"
+BODY = b"x" * 60
+
+
+class _StaticNodes:
+    def __init__(self, node: NodeInfo):
+        self.node = node
+
+    def get_current_node(self):
+        return self.node
+
+    def get_candidate_nodes(self, limit):
+        return [self.node]
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("closed")
+        buf += chunk
+    return buf
+
+
+def _send_message(sock: socket.socket) -> None:
+    sock.sendall(HEADER)
+    # A little "work" between the two writes, as a real encoder would have
+    time.sleep(0.0002)
+    sock.sendall(BODY)
+
+
+def _backend() -> int:
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(16)
+
+    def serve(conn: socket.socket) -> None:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                _recv_exact(conn, len(HEADER) + len(BODY))
+                _send_message(conn)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+    def accept_loop() -> None:
+        while True:
+            conn, _ = listener.accept()
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def _free_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def measure(profile: str, backend_port: int, rounds: int) -> list:
+    node = NodeInfo(hostname="bench", ip="127.0.0.1", port=backend_port, reachable=True)
+    listen_port = _free_port()
+    proxy = ProxyServer(
+        "127.0.0.1", listen_port, _StaticNodes(node), socket_profile=profile, relay_mode="copy"
+    )
+    proxy.start()
+    try:
+        client = socket.create_connection(("127.0.0.1", listen_port))
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _send_message(client)
+            _recv_exact(client, len(HEADER) + len(BODY))
+            samples.append((time.perf_counter() - start) * 1000)
+        client.close()
+        return samples
+    finally:
+        proxy.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--profiles", nargs="*", default=list(SOCKET_PROFILES))
+    args = parser.parse_args()
+
+    backend_port = _backend()
+    print(f"{'profile':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for profile in args.profiles:
+        samples = sorted(measure(profile, backend_port, args.rounds))
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(
+            f"{profile:<14}{statistics.mean(samples):>10.3f}"
+            f"{statistics.median(samples):>10.3f}{p99:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
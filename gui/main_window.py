@@ -1,3 +1,4 @@
+import time
 from typing import List, Callable, Optional
 
 from PySide6.QtCore import Qt, QTimer, Signal, QObject, QUrl
@@ -17,7 +18,7 @@ from PySide6.QtWidgets import (
     QAbstractItemView
 )
 
-from mtrproxy.types import NodeInfo, ProxyStatus
+from mtrproxy.types import NodeInfo, ProxyStatus, SessionInfo
 from .sponsor_dialog import SponsorDialog
 
 
@@ -31,6 +32,17 @@ class BackendSignals(QObject):
     update_ad = Signal(dict)
     show_update = Signal(dict)
 
+
+def _format_bytes(n: float) -> str:
+    if n < 1024:
+        return f"{n:.0f} B"
+    for unit in ("KB", "MB"):
+        n /= 1024
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+    return f"{n / 1024:.1f} GB"
+
+
 class MainWindow(QMainWindow):
     def __init__(
         self,
@@ -42,6 +54,7 @@ class MainWindow(QMainWindow):
         on_open_settings: Callable[[], None],
         sponsor_links: List[dict],
         ad_config: dict,
+        get_sessions: Optional[Callable[[], List[SessionInfo]]] = None,
     ):
         super().__init__()
         self.signals = signals
@@ -50,6 +63,7 @@ class MainWindow(QMainWindow):
         self.on_refresh_nodes = on_refresh_nodes
         self.on_select_node = on_select_node
         self.on_open_settings = on_open_settings
+        self.get_sessions = get_sessions
         self.sponsor_links = sponsor_links
         self.ad_config = ad_config
 
@@ -62,6 +76,7 @@ class MainWindow(QMainWindow):
         self.status_label_port = QLabel("监听端口: -")
         self.status_label_uptime = QLabel("运行时间: -")
         self.status_label_conn = QLabel("连接数: 0")
+        self.status_label_traffic = QLabel("流量: -")
 
         top_bar = QHBoxLayout()
         top_bar.addWidget(self.status_label_run)
@@ -70,6 +85,7 @@ class MainWindow(QMainWindow):
         top_bar.addWidget(self.status_label_port)
         top_bar.addWidget(self.status_label_uptime)
         top_bar.addWidget(self.status_label_conn)
+        top_bar.addWidget(self.status_label_traffic)
         top_bar.addStretch()
 
         self.btn_toggle_proxy = QPushButton("启动代理")
@@ -86,15 +102,23 @@ class MainWindow(QMainWindow):
         btn_bar.addWidget(self.btn_sponsor)
         btn_bar.addStretch()
 
-        self.table = QTableWidget(0, 8)
-        self.table.setHorizontalHeaderLabels(["节点名", "分组", "IP", "端口", "使用人数", "延迟(ms)", "状态", "操作"])
+        self.table = QTableWidget(0, 10)
+        self.table.setHorizontalHeaderLabels(
+            ["节点名", "分组", "IP", "端口", "使用人数", "延迟(ms)", "抖动(ms)", "丢包", "状态", "操作"]
+        )
         self.table.horizontalHeader().setStretchLastSection(False) # Disable stretch for last column
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(7, QHeaderView.Fixed) # Last column fixed width
-        self.table.setColumnWidth(7, 60) # Set small width
+        self.table.horizontalHeader().setSectionResizeMode(9, QHeaderView.Fixed) # Last column fixed width
+        self.table.setColumnWidth(9, 60) # Set small width
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
+        self.session_table = QTableWidget(0, 5)
+        self.session_table.setHorizontalHeaderLabels(["客户端", "节点", "时长", "上行", "下行"])
+        self.session_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.session_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.session_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+
         self.log_view = QPlainTextEdit()
         self.log_view.setReadOnly(True)
 
@@ -104,9 +128,11 @@ class MainWindow(QMainWindow):
         table_layout.setContentsMargins(0, 0, 0, 0)
         table_layout.addWidget(self.table)
         splitter.addWidget(table_container)
+        splitter.addWidget(self.session_table)
         splitter.addWidget(self.log_view)
         splitter.setStretchFactor(0, 3)
         splitter.setStretchFactor(1, 1)
+        splitter.setStretchFactor(2, 1)
 
         self.ad_label = QLabel()
         self.ad_label.setAlignment(Qt.AlignCenter)
@@ -242,7 +268,16 @@ class MainWindow(QMainWindow):
             self.status_label_node.setText("当前节点: -")
             self.status_label_latency.setText("延迟: -")
         self.status_label_port.setText(f"监听端口: {status.listen_port}")
-        self.status_label_conn.setText(f"连接数: {status.active_connections}")
+        conn_text = f"连接数: {status.active_connections}"
+        if status.rejected_connections:
+            conn_text += f" (已拒绝 {status.rejected_connections})"
+        if status.reaped_sessions:
+            conn_text += f" (空闲断开 {status.reaped_sessions})"
+        self.status_label_conn.setText(conn_text)
+        self.status_label_traffic.setText(
+            f"流量: ↑{_format_bytes(status.bytes_up)} ({_format_bytes(status.rate_up_bps)}/s)"
+            f" ↓{_format_bytes(status.bytes_down)} ({_format_bytes(status.rate_down_bps)}/s)"
+        )
         self._elapsed_uptime = status.uptime_seconds
         self._update_uptime_label()
 
@@ -254,15 +289,27 @@ class MainWindow(QMainWindow):
         self.status_label_uptime.setText(f"运行时间: {h:02d}:{m:02d}:{sec:02d}")
 
     def _tick(self) -> None:
-        # Just update uptime UI if running, although status update also does it.
-        # This timer is mainly for per-second UI refresh if status update is less frequent.
-        # But status update handles uptime.
-        pass
+        # Uptime comes with status updates; the session list is polled here
+        # since it is too large to push with every status.
+        if self.get_sessions and self.session_table.isVisible():
+            self._update_sessions(self.get_sessions())
+
+    def _update_sessions(self, sessions: List[SessionInfo]) -> None:
+        sessions.sort(key=lambda s: s.started_at)
+        now = time.time()
+        self.session_table.setRowCount(len(sessions))
+        for row, s in enumerate(sessions):
+            elapsed = int(now - s.started_at)
+            self.session_table.setItem(row, 0, QTableWidgetItem(f"{s.client_ip}:{s.client_port}"))
+            self.session_table.setItem(row, 1, QTableWidgetItem(s.node or "-"))
+            self.session_table.setItem(
+                row, 2, QTableWidgetItem(f"{elapsed // 3600:02d}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d}")
+            )
+            self.session_table.setItem(row, 3, QTableWidgetItem(_format_bytes(s.bytes_up)))
+            self.session_table.setItem(row, 4, QTableWidgetItem(_format_bytes(s.bytes_down)))
 
     def on_nodes_updated(self, nodes: List[NodeInfo]) -> None:
-        # Sort nodes by priority (asc)
-        nodes.sort(key=lambda n: n.priority)
-        
+        # Already sorted by priority (asc) by NodeManager.list_nodes
         self.table.setRowCount(len(nodes))
 
         for row, n in enumerate(nodes):
@@ -272,8 +319,16 @@ class MainWindow(QMainWindow):
             self.table.setItem(row, 3, QTableWidgetItem(str(n.port)))
             self.table.setItem(row, 4, QTableWidgetItem(str(n.online_count)))
             
+            # Smoothed latency; the raw distribution is in the tooltip
             latency_text = "-" if n.latency_ms is None else str(int(n.latency_ms))
             item_latency = QTableWidgetItem(latency_text)
+            if n.latency_p50_ms is not None:
+                item_latency.setToolTip(
+                    f"p50 {n.latency_p50_ms:.0f} ms / p95 {n.latency_p95_ms:.0f} ms"
+                    + (f" / 最近 {n.last_sample_ms:.0f} ms" if n.last_sample_ms is not None else " / 最近 超时")
+                    + (f"\n连接 {n.connect_ms:.1f} ms / 状态 {n.status_ms:.1f} ms" if n.connect_ms is not None else "")
+                    + (f" / RTT {n.rtt_ms:.1f} ms" if n.rtt_ms is not None else "")
+                )
             
             color = QColor("gray")
             if not n.reachable and n.status == "unreachable":
@@ -288,8 +343,10 @@ class MainWindow(QMainWindow):
             
             item_latency.setForeground(color)
             self.table.setItem(row, 5, item_latency)
-            self.table.setItem(row, 6, QTableWidgetItem(n.motd if n.motd else n.status))
+            self.table.setItem(row, 6, QTableWidgetItem("-" if n.jitter_ms is None else f"{n.jitter_ms:.1f}"))
+            self.table.setItem(row, 7, QTableWidgetItem(f"{n.loss_rate:.0%}"))
+            self.table.setItem(row, 8, QTableWidgetItem(n.motd if n.motd else n.status))
 
             btn = QPushButton("选择")
             btn.clicked.connect(lambda checked=False, host=n.hostname: self.on_select_node(host))
-            self.table.setCellWidget(row, 7, btn)
+            self.table.setCellWidget(row, 9, btn)
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 import threading
 from pathlib import Path
@@ -5,8 +6,12 @@ from pathlib import Path
 from PySide6.QtWidgets import QApplication, QStyle
 
 from mtrproxy.config import ConfigManager
+from mtrproxy.events import EventBus
 from mtrproxy.nodes import NodeManager
 from mtrproxy.proxy_core import ProxyServer
+from mtrproxy.proxy_async import AsyncProxyServer
+from mtrproxy.udp_relay import UdpRelayServer
+from mtrproxy.workers import REUSEPORT_AVAILABLE, WorkerSupervisor
 from mtrproxy.announcement import fetch_announcement, should_show_announcement
 from mtrproxy.autostart_win import set_windows_autostart
 from mtrproxy.heartbeat import HeartbeatManager
@@ -31,21 +36,105 @@ def main() -> None:
     data = cfg.get_all()
 
     signals = BackendSignals()
+    # Coalesces status / node-list updates so connection storms can't flood the GUI thread
+    events = EventBus(max_rate_hz=data.get("status_max_rate_hz", 4))
 
+    def on_node_switched(record) -> None:
+        # Manual switches are already logged by on_select_node
+        if record.reason != "manual":
+            signals.log_message.emit(f"自动切换节点: {record.from_node or '-'} -> {record.to_node} ({record.reason})")
+
+    # Last known nodes and latencies, so routing works before the first fetch
+    snapshot_path = data.get("node_snapshot_path", "nodes_snapshot.json")
     node_manager = NodeManager(
         remote_api=data.get("remote_nodes_api", ""),
         detect_interval_seconds=data.get("detect_interval_seconds", 60),
         auto_detect_enabled=data.get("auto_detect_enabled", False),
         on_nodes_updated=lambda nodes: signals.nodes_updated.emit(nodes),
         on_best_node_changed=None,
+        event_bus=events,
+        status_cache_ttl=data.get("status_cache_ttl_seconds", 30),
+        probe_concurrency=data.get("probe_concurrency", 64),
+        probe_deadline_seconds=data.get("probe_deadline_seconds", 15),
+        probe_timeout_seconds=data.get("probe_timeout_seconds", 2),
+        probe_mode=data.get("probe_mode", "ping"),
+        probe_ping_count=data.get("probe_ping_count", 3),
+        node_delta_enabled=data.get("node_delta_enabled", True),
+        snapshot_path=Path(snapshot_path) if snapshot_path else None,
+        snapshot_interval_seconds=data.get("node_snapshot_interval_seconds", 30),
+        probe_rate_per_second=data.get("probe_rate_per_second", 20),
+        probe_hot_count=data.get("probe_hot_count", 3),
+        probe_hot_interval_seconds=data.get("probe_hot_interval_seconds", 10),
+        probe_max_backoff_seconds=data.get("probe_max_backoff_seconds", 600),
+        switch_min_improvement_ms=data.get("switch_min_improvement_ms", 10),
+        switch_min_improvement_ratio=data.get("switch_min_improvement_ratio", 0.15),
+        switch_min_dwell_seconds=data.get("switch_min_dwell_seconds", 60),
+        switch_confirm_rounds=data.get("switch_confirm_rounds", 3),
+        on_node_switched=on_node_switched,
+        latency_window_size=data.get("latency_window_size", 32),
+        unreachable_after_losses=data.get("unreachable_after_losses", 2),
     )
+    snapshot_loaded = node_manager.load_snapshot()
+    app.aboutToQuit.connect(node_manager.stop)
 
-    proxy = ProxyServer(
-        listen_host=data.get("listen_host", "127.0.0.1"),
-        listen_port=data.get("listen_port", 1080),
-        node_manager=node_manager,
-        on_status=lambda status: signals.status_updated.emit(status),
-    )
+    proxy_engine = data.get("proxy_engine", "thread")
+    proxy_options = {
+        "relay_mode": data.get("relay_mode", "auto"),
+        "relay_buffer_size": data.get("relay_buffer_size", 65536),
+        "backend_pool_size": data.get("backend_pool_size", 0),
+        "backend_pool_max_idle": data.get("backend_pool_max_idle_seconds", 10),
+        "connect_race_count": data.get("connect_race_count", 1),
+        "connect_race_stagger_ms": data.get("connect_race_stagger_ms", 50),
+        "max_connections": data.get("max_connections", 0),
+        "max_connections_per_ip": data.get("max_connections_per_ip", 0),
+        "max_pending_connects": data.get("max_pending_connects", 0),
+        "socket_profile": data.get("socket_profile", "low-latency"),
+        "socket_profiles": data.get("socket_profiles", {}),
+        "node_socket_profiles": data.get("node_socket_profiles", {}),
+        "connect_failover_attempts": data.get("connect_failover_attempts", 2),
+        "connect_timeout_floor_ms": data.get("connect_timeout_floor_ms", 1000),
+        "connect_timeout_max_ms": data.get("connect_timeout_max_ms", 5000),
+        "connect_timeout_rtt_multiplier": data.get("connect_timeout_rtt_multiplier", 4),
+        "suspect_after_failures": data.get("suspect_after_failures", 3),
+        "suspect_cooldown_seconds": data.get("suspect_cooldown_seconds", 30),
+        "balance_policy": data.get("balance_policy", "none"),
+        "balance_latency_band_ms": data.get("balance_latency_band_ms", 20),
+        "idle_timeout_seconds": data.get("idle_timeout_seconds", 600),
+    }
+    worker_processes = data.get("worker_processes", 0)
+    if worker_processes > 1 and REUSEPORT_AVAILABLE:
+        proxy = WorkerSupervisor(
+            listen_host=data.get("listen_host", "127.0.0.1"),
+            listen_port=data.get("listen_port", 1080),
+            node_manager=node_manager,
+            on_status=lambda status: signals.status_updated.emit(status),
+            workers=worker_processes,
+            engine=proxy_engine,
+            proxy_options=proxy_options,
+            event_bus=events,
+            status_cache_ttl=data.get("status_cache_ttl_seconds", 30) if data.get("status_cache_enabled", True) else None,
+        )
+    else:
+        proxy_cls = AsyncProxyServer if proxy_engine == "asyncio" else ProxyServer
+        proxy = proxy_cls(
+            listen_host=data.get("listen_host", "127.0.0.1"),
+            listen_port=data.get("listen_port", 1080),
+            node_manager=node_manager,
+            on_status=lambda status: signals.status_updated.emit(status),
+            event_bus=events,
+            status_cache=node_manager.status_cache if data.get("status_cache_enabled", True) else None,
+            **proxy_options,
+        )
+
+    udp_relay = None
+    if data.get("bedrock_enabled", False):
+        udp_relay = UdpRelayServer(
+            listen_host=data.get("listen_host", "127.0.0.1"),
+            listen_port=data.get("bedrock_listen_port", 19132),
+            node_manager=node_manager,
+            flow_idle_seconds=data.get("bedrock_flow_idle_seconds", 60),
+            max_flows=data.get("bedrock_max_flows", 4096),
+        )
 
     heartbeat = HeartbeatManager(
         api_url=data.get("heartbeat_api", "https://example.com/api/heartbeat"),
@@ -54,14 +143,38 @@ def main() -> None:
         interval=60
     )
 
+    stop_drain_seconds = data.get("stop_drain_seconds", 5)
+    stopping = threading.Event()
+
     def on_toggle_proxy() -> None:
-        if proxy._server_sock:
-            proxy.stop()
+        if stopping.is_set():
+            signals.log_message.emit("代理服务正在停止，请稍候")
+            return
+        if proxy.is_running():
+            # Draining can take a while; keep the GUI responsive meanwhile
+            def _stop():
+                try:
+                    proxy.stop(drain_timeout=stop_drain_seconds)
+                finally:
+                    stopping.clear()
+                signals.log_message.emit("代理服务已停止")
+
+            stopping.set()
+
+            signals.log_message.emit("代理服务停止中，等待现有连接结束...")
+            threading.Thread(target=_stop, daemon=True).start()
+            if udp_relay:
+                udp_relay.stop()
             heartbeat.stop()
-            signals.log_message.emit("代理服务已停止")
             tray.update_status(False)
         else:
-            proxy.start()
+            if not proxy.start():
+                signals.log_message.emit(f"代理服务启动失败，无法监听端口 {proxy.listen_port}")
+                return
+            if udp_relay:
+                udp_relay.start()
+                if udp_relay.is_running():
+                    signals.log_message.emit(f"基岩版 UDP 转发已启动，端口 {udp_relay.listen_port}")
             
             # Get current node info for heartbeat
             node_info = None
@@ -108,17 +221,27 @@ def main() -> None:
             cfg.update_bulk(new_data)
             cfg.save()
             
-            node_manager.remote_api = new_data["remote_nodes_api"]
-            node_manager.detect_interval_seconds = new_data["detect_interval_seconds"]
-            node_manager.auto_detect_enabled = new_data["auto_detect_enabled"]
+            # Node settings only affect sessions started from now on;
+            # relays already running keep their backend.
+            node_manager.remote_api = cfg.get("remote_nodes_api", node_manager.remote_api)
+            node_manager.detect_interval_seconds = cfg.get(
+                "detect_interval_seconds", node_manager.detect_interval_seconds
+            )
+            node_manager.auto_detect_enabled = cfg.get("auto_detect_enabled", node_manager.auto_detect_enabled)
             
-            if proxy.listen_port != new_data["listen_port"]:
-                 proxy.listen_port = new_data["listen_port"]
-                 signals.log_message.emit("监听端口配置已更新，请重启代理以生效")
+            new_port = new_data.get("listen_port", proxy.listen_port)
+            if proxy.listen_port != new_port:
+                if not proxy.is_running():
+                    proxy.rebind(listen_port=new_port)
+                    signals.log_message.emit(f"监听端口已更新为 {new_port}")
+                elif proxy.rebind(listen_port=new_port):
+                    signals.log_message.emit(f"已切换到监听端口 {new_port}，现有连接不受影响")
+                else:
+                    signals.log_message.emit(f"无法监听端口 {new_port}，继续使用端口 {proxy.listen_port}")
             
             set_windows_autostart("mtrproxy_gui", new_data.get("windows_autostart", False))
             
-            win.ad_config = new_data.get("ad", {})
+            win.ad_config = cfg.get("ad", {})
             win._update_ad_label()
             signals.log_message.emit("配置已保存")
 
@@ -129,6 +252,7 @@ def main() -> None:
         on_refresh_nodes=on_refresh_nodes,
         on_select_node=on_select_node,
         on_open_settings=on_open_settings,
+        get_sessions=proxy.list_sessions,
         sponsor_links=data.get("sponsor_links", []),
         ad_config=data.get("ad", {}),
     )
@@ -151,6 +275,14 @@ def main() -> None:
     tray.setIcon(icon)
 
     # Initial tasks
+    if isinstance(proxy, WorkerSupervisor):
+        signals.log_message.emit(
+            f"多进程模式 ({proxy.workers} 个进程)：会话列表不可用，服务器列表缓存由各进程独立维护"
+        )
+    if snapshot_loaded:
+        current = node_manager.get_current_node()
+        signals.nodes_updated.emit(node_manager.list_nodes())
+        signals.log_message.emit(f"已载入上次的节点列表，当前节点: {current.hostname if current else '-'}")
     on_refresh_nodes()
     node_manager.start()
 
@@ -194,4 +326,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Worker processes are spawned from the frozen executable
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,79 @@
+import socket
+import struct
+import threading
+from typing import Dict, Optional
+
+REJECT_GLOBAL = "global"
+REJECT_PER_IP = "per_ip"
+REJECT_PENDING = "pending"
+
+
+class AdmissionController:
+    # Decides at accept() time whether a new client may proceed, so that an
+    # overload is turned away before it costs threads, fds or backend
+    # connects. A limit of 0 means unlimited.
+    #
+    # "pending" counts admitted clients that have not reached the relay
+    # phase yet (reading the handshake, connecting to a backend); bounding it
+    # keeps a connect storm from piling up behind a slow node.
+
+    def __init__(self, max_connections: int = 0, max_per_ip: int = 0, max_pending: int = 0):
+        self.max_connections = max_connections
+        self.max_per_ip = max_per_ip
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._pending = 0
+        self._per_ip: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {REJECT_GLOBAL: 0, REJECT_PER_IP: 0, REJECT_PENDING: 0}
+
+    def admit(self, ip: str) -> Optional[str]:
+        # Returns None if admitted, otherwise the rejection reason.
+        with self._lock:
+            reason = None
+            if self.max_connections and self._active >= self.max_connections:
+                reason = REJECT_GLOBAL
+            elif self.max_per_ip and self._per_ip.get(ip, 0) >= self.max_per_ip:
+                reason = REJECT_PER_IP
+            elif self.max_pending and self._pending >= self.max_pending:
+                reason = REJECT_PENDING
+            if reason:
+                self.rejected[reason] += 1
+                return reason
+            self._active += 1
+            self._pending += 1
+            self._per_ip[ip] = self._per_ip.get(ip, 0) + 1
+            return None
+
+    def connected(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def release(self, ip: str, pending: bool) -> None:
+        with self._lock:
+            self._active -= 1
+            if pending:
+                self._pending -= 1
+            count = self._per_ip.get(ip, 0) - 1
+            if count > 0:
+                self._per_ip[ip] = count
+            else:
+                self._per_ip.pop(ip, None)
+
+    def rejected_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.rejected)
+
+
+def reject_socket(sock: socket.socket) -> None:
+    # Close with RST instead of FIN: no TIME_WAIT, and the client learns
+    # immediately that it was refused.
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    except OSError:
+        pass
+    try:
+        sock.close()
+    except OSError:
+        pass
@@ -0,0 +1,127 @@
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from .types import NodeInfo
+
+
+def _node_key(node: NodeInfo) -> Tuple[str, int]:
+    return (node.ip, node.port)
+
+
+def _is_alive(sock: socket.socket) -> bool:
+    # Idle sockets are kept non-blocking. An idle backend should have nothing
+    # to say yet: EOF means it closed the socket, unexpected bytes mean the
+    # stream is no longer clean.
+    try:
+        sock.recv(1, socket.MSG_PEEK)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+class BackendPool:
+    # Keeps a few already-connected idle sockets to the current node so a
+    # new client can be relayed without waiting for a TCP handshake. Sockets
+    # are dropped when they get old or the selected node changes.
+
+    def __init__(
+        self,
+        node_manager,
+        size: int = 2,
+        max_idle_seconds: float = 10.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.node_manager = node_manager
+        self.size = max(0, int(size))
+        self.max_idle_seconds = max_idle_seconds
+        self.connect_timeout = connect_timeout
+
+        self._idle: Deque[Tuple[float, socket.socket]] = deque()
+        self._key: Optional[Tuple[str, int]] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.size <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._flush()
+
+    def acquire(self, node: NodeInfo) -> Optional[socket.socket]:
+        key = _node_key(node)
+        now = time.monotonic()
+        taken: Optional[socket.socket] = None
+        with self._lock:
+            if self._key != key:
+                return None
+            while self._idle:
+                created, sock = self._idle.popleft()
+                if now - created < self.max_idle_seconds and _is_alive(sock):
+                    taken = sock
+                    break
+                self._close(sock)
+        self._wakeup.set()
+        if taken:
+            taken.setblocking(True)
+        return taken
+
+    def _flush(self) -> None:
+        with self._lock:
+            while self._idle:
+                self._close(self._idle.popleft()[1])
+            self._key = None
+
+    @staticmethod
+    def _close(sock: socket.socket) -> None:
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _refill_loop(self) -> None:
+        while not self._stop_event.is_set():
+            node = self.node_manager.get_current_node()
+            key = _node_key(node) if node and node.reachable else None
+            now = time.monotonic()
+            with self._lock:
+                if key != self._key:
+                    while self._idle:
+                        self._close(self._idle.popleft()[1])
+                    self._key = key
+                # Sockets are appended in creation order, so stale ones sit at the front
+                while self._idle and now - self._idle[0][0] >= self.max_idle_seconds:
+                    self._close(self._idle.popleft()[1])
+                missing = self.size - len(self._idle) if key else 0
+
+            for _ in range(missing):
+                if self._stop_event.is_set():
+                    break
+                try:
+                    sock = socket.create_connection(key, timeout=self.connect_timeout)
+                except OSError:
+                    break
+                sock.setblocking(False)
+                with self._lock:
+                    if self._key != key:
+                        self._close(sock)
+                        break
+                    self._idle.append((time.monotonic(), sock))
+
+            self._wakeup.wait(timeout=1)
+            self._wakeup.clear()
@@ -0,0 +1,90 @@
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .node_index import node_rank
+from .types import NodeInfo
+
+# How new sessions are spread over nodes of the current node's group whose
+# effective latency (jitter- and loss-adjusted, as node selection ranks
+# them) is within `latency_band_ms` of the fastest one:
+#   none              - always the selected node (the old behaviour)
+#   latency           - random, weighted by 1 / effective latency
+#   least-connections - fewest sessions opened by this proxy, then latency
+#   weighted          - random, weighted by priority (lower is better) and
+#                       the node's reported online_count
+POLICY_NONE = "none"
+POLICY_LATENCY = "latency"
+POLICY_LEAST_CONNECTIONS = "least-connections"
+POLICY_WEIGHTED = "weighted"
+BALANCE_POLICIES = (POLICY_NONE, POLICY_LATENCY, POLICY_LEAST_CONNECTIONS, POLICY_WEIGHTED)
+
+# How many of the fastest nodes are looked at when building the band.
+BALANCE_CANDIDATES = 8
+
+
+class NodeBalancer:
+    # Reorders the proxy's candidate list so the balanced pick goes first;
+    # the rest keep their latency order as failover alternatives. A manual
+    # selection reaches here as a single candidate and is left alone.
+
+    def __init__(self, policy: str = POLICY_NONE, latency_band_ms: float = 20.0):
+        if policy not in BALANCE_POLICIES:
+            print(f"Unknown balance policy {policy!r}, using {POLICY_NONE!r}")
+            policy = POLICY_NONE
+        self.policy = policy
+        self.latency_band_ms = latency_band_ms
+        self._active: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def order(self, candidates: List[NodeInfo]) -> List[NodeInfo]:
+        if self.policy == POLICY_NONE or len(candidates) < 2:
+            return candidates
+        band = self._band(candidates)
+        if len(band) < 2:
+            return candidates
+        pick = self._pick(band)
+        return [pick] + [n for n in candidates if n is not pick]
+
+    def _band(self, candidates: List[NodeInfo]) -> List[NodeInfo]:
+        group = candidates[0].group
+        ranked = [
+            (node_rank(n), n) for n in candidates
+            if n.group == group and n.reachable and n.latency_ms is not None
+        ]
+        if not ranked:
+            return []
+        best = min(rank for rank, _ in ranked)
+        return [n for rank, n in ranked if rank <= best + self.latency_band_ms]
+
+    def _pick(self, band: List[NodeInfo]) -> NodeInfo:
+        if self.policy == POLICY_LEAST_CONNECTIONS:
+            with self._lock:
+                return min(band, key=lambda n: (self._active.get((n.ip, n.port), 0), node_rank(n)))
+        if self.policy == POLICY_LATENCY:
+            weights = [1.0 / max(1.0, node_rank(n)) for n in band]
+        else:
+            weights = [1.0 / max(1, n.priority) / (1 + max(0, n.online_count)) for n in band]
+        return random.choices(band, weights=weights)[0]
+
+    def opened(self, node: Optional[NodeInfo]) -> None:
+        if node is None:
+            return
+        key = (node.ip, node.port)
+        with self._lock:
+            self._active[key] = self._active.get(key, 0) + 1
+
+    def closed(self, node: Optional[NodeInfo]) -> None:
+        if node is None:
+            return
+        key = (node.ip, node.port)
+        with self._lock:
+            count = self._active.get(key, 0) - 1
+            if count > 0:
+                self._active[key] = count
+            else:
+                self._active.pop(key, None)
+
+    def active_counts(self) -> Dict[Tuple[str, int], int]:
+        with self._lock:
+            return dict(self._active)
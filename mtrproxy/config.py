@@ -19,8 +19,57 @@ class ConfigManager:
                 "version": "1.0.0",
                 "listen_host": "127.0.0.1",
                 "listen_port": 1080,
+                "proxy_engine": "thread",
+                "relay_mode": "auto",
+                "relay_buffer_size": 65536,
+                "worker_processes": 0,
+                "backend_pool_size": 0,
+                "backend_pool_max_idle_seconds": 10,
+                "connect_race_count": 1,
+                "connect_race_stagger_ms": 50,
+                "status_cache_enabled": True,
+                "status_cache_ttl_seconds": 30,
+                "max_connections": 0,
+                "max_connections_per_ip": 0,
+                "max_pending_connects": 0,
+                "socket_profile": "low-latency",
+                "socket_profiles": {},
+                "node_socket_profiles": {},
+                "connect_failover_attempts": 2,
+                "connect_timeout_floor_ms": 1000,
+                "connect_timeout_max_ms": 5000,
+                "connect_timeout_rtt_multiplier": 4,
+                "suspect_after_failures": 3,
+                "suspect_cooldown_seconds": 30,
+                "balance_policy": "none",
+                "balance_latency_band_ms": 20,
+                "idle_timeout_seconds": 600,
+                "stop_drain_seconds": 5,
+                "bedrock_enabled": False,
+                "bedrock_listen_port": 19132,
+                "bedrock_flow_idle_seconds": 60,
+                "bedrock_max_flows": 4096,
                 "auto_detect_enabled": False,
                 "detect_interval_seconds": 60,
+                "probe_concurrency": 64,
+                "probe_deadline_seconds": 15,
+                "probe_timeout_seconds": 2,
+                "probe_mode": "ping",
+                "node_delta_enabled": True,
+                "node_snapshot_path": "nodes_snapshot.json",
+                "node_snapshot_interval_seconds": 30,
+                "probe_ping_count": 3,
+                "probe_rate_per_second": 20,
+                "probe_hot_count": 3,
+                "probe_hot_interval_seconds": 10,
+                "probe_max_backoff_seconds": 600,
+                "switch_min_improvement_ms": 10,
+                "switch_min_improvement_ratio": 0.15,
+                "switch_min_dwell_seconds": 60,
+                "switch_confirm_rounds": 3,
+                "latency_window_size": 32,
+                "unreachable_after_losses": 2,
+                "status_max_rate_hz": 4,
                 "remote_nodes_api": "https://apimc.lnlfly.com/api/nodes",
                 "announcement_api": "https://apimc.lnlfly.com/api/announcement",
                 "heartbeat_api": "https://apimc.lnlfly.com/api/heartbeat",
@@ -0,0 +1,181 @@
+import asyncio
+import errno
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .types import NodeInfo
+
+
+def _close(sock: socket.socket) -> None:
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+class ConnectHealth:
+    # Tracks backend connect failures per ip:port. After `suspect_after`
+    # consecutive failures a node is suspect for `cooldown` seconds and new
+    # sessions skip it instead of waiting on it again.
+
+    def __init__(self, suspect_after: int = 3, cooldown: float = 30.0):
+        self.suspect_after = max(1, suspect_after)
+        self.cooldown = cooldown
+        self._failures: Dict[Tuple[str, int], int] = {}
+        self._suspect_until: Dict[Tuple[str, int], float] = {}
+        self._lock = threading.Lock()
+
+    def failure(self, node: NodeInfo) -> None:
+        key = (node.ip, node.port)
+        with self._lock:
+            count = self._failures.get(key, 0) + 1
+            self._failures[key] = count
+            if count >= self.suspect_after:
+                self._suspect_until[key] = time.monotonic() + self.cooldown
+
+    def success(self, node: NodeInfo) -> None:
+        key = (node.ip, node.port)
+        with self._lock:
+            self._failures.pop(key, None)
+            self._suspect_until.pop(key, None)
+
+    def is_suspect(self, node: NodeInfo) -> bool:
+        key = (node.ip, node.port)
+        with self._lock:
+            until = self._suspect_until.get(key)
+            if until is None:
+                return False
+            if time.monotonic() >= until:
+                # Cooldown over: allow one more try before suspecting again
+                del self._suspect_until[key]
+                self._failures[key] = self.suspect_after - 1
+                return False
+            return True
+
+
+def race_connect(
+    nodes: List[NodeInfo],
+    stagger: float = 0.05,
+    timeout: float = 5.0,
+    on_failure: Optional[Callable[[NodeInfo], None]] = None,
+) -> Tuple[socket.socket, NodeInfo]:
+    # "Happy eyeballs" across nodes: start a non-blocking connect to the
+    # first node, add the next one every `stagger` seconds (or as soon as an
+    # attempt fails), keep whichever completes first and close the rest.
+    if not nodes:
+        raise OSError("no candidate nodes")
+    sel = selectors.DefaultSelector()
+    pending = {}
+    next_index = 0
+    deadline = time.monotonic() + timeout
+    next_start = time.monotonic()
+    last_error: Optional[OSError] = None
+
+    def launch(node: NodeInfo) -> None:
+        nonlocal last_error
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except OSError as e:
+            last_error = e
+            return
+        sock.setblocking(False)
+        err = sock.connect_ex((node.ip, node.port))
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", -1)):
+            last_error = OSError(err, f"connect to {node.ip}:{node.port} failed")
+            _close(sock)
+            if on_failure:
+                on_failure(node)
+            return
+        pending[sock] = node
+        sel.register(sock, selectors.EVENT_WRITE)
+
+    try:
+        while True:
+            now = time.monotonic()
+            if next_index < len(nodes) and (now >= next_start or not pending):
+                launch(nodes[next_index])
+                next_index += 1
+                next_start = now + stagger
+                continue
+            if not pending:
+                raise last_error or OSError("all candidate nodes failed")
+            if now >= deadline:
+                if on_failure:
+                    for node in pending.values():
+                        on_failure(node)
+                raise socket.timeout("connect race timed out")
+
+            wait = deadline - now
+            if next_index < len(nodes):
+                wait = min(wait, max(0.0, next_start - now))
+            for key, _ in sel.select(wait):
+                sock = key.fileobj
+                node = pending.pop(sock)
+                sel.unregister(sock)
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err == 0:
+                    sock.setblocking(True)
+                    return sock, node
+                last_error = OSError(err, f"connect to {node.ip}:{node.port} failed")
+                _close(sock)
+                if on_failure:
+                    on_failure(node)
+                # Don't wait out the stagger when an attempt fails outright
+                next_start = time.monotonic()
+    finally:
+        for sock in pending:
+            _close(sock)
+        sel.close()
+
+
+async def race_connect_async(
+    nodes: List[NodeInfo],
+    stagger: float = 0.05,
+    timeout: float = 5.0,
+    limit: int = 65536,
+    on_failure: Optional[Callable[[NodeInfo], None]] = None,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, NodeInfo]:
+    if not nodes:
+        raise OSError("no candidate nodes")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = {}
+    last_error: Optional[BaseException] = None
+    index = 0
+    try:
+        while True:
+            if index < len(nodes):
+                node = nodes[index]
+                index += 1
+                task = asyncio.ensure_future(asyncio.open_connection(node.ip, node.port, limit=limit))
+                pending[task] = node
+            if not pending:
+                raise last_error or OSError("all candidate nodes failed")
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                if on_failure:
+                    for node in pending.values():
+                        on_failure(node)
+                raise asyncio.TimeoutError("connect race timed out")
+            wait = min(stagger, remaining) if index < len(nodes) else remaining
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                node = pending.pop(task)
+                if task.exception() is None:
+                    reader, writer = task.result()
+                    return reader, writer, node
+                last_error = task.exception()
+                if on_failure:
+                    on_failure(node)
+    finally:
+        for task in pending:
+            task.cancel()
+            task.add_done_callback(_close_cancelled)
+
+
+def _close_cancelled(task: "asyncio.Future") -> None:
+    if not task.cancelled() and task.exception() is None:
+        task.result()[1].close()
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+TOPIC_STATUS = "status"
+TOPIC_NODES_UPDATED = "nodes_updated"
+
+
+class EventBus:
+    # Small pub/sub layer between the backend and the GUI. Publishing only
+    # records "topic is dirty" plus how to build its payload; a dispatcher
+    # thread delivers each topic at most max_rate_hz times per second and
+    # always with the latest state, so bursts of updates collapse into one.
+
+    def __init__(self, max_rate_hz: float = 4.0):
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self._subscribers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._pending: Dict[str, Callable[[], Any]] = {}
+        self._last_delivery: Dict[str, float] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, topic: str, callback: Callable[[Any], None]) -> None:
+        with self._cond:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic: str, callback: Callable[[Any], None]) -> None:
+        with self._cond:
+            subs = self._subscribers.get(topic)
+            if subs and callback in subs:
+                subs.remove(callback)
+
+    def has_subscribers(self, topic: str) -> bool:
+        with self._cond:
+            return bool(self._subscribers.get(topic))
+
+    def publish(self, topic: str, payload: Any = None, factory: Optional[Callable[[], Any]] = None) -> None:
+        # Pass `factory` to defer building an expensive payload until (and
+        # unless) it is actually delivered.
+        if factory is None:
+            factory = lambda: payload  # noqa: E731
+        with self._cond:
+            if not self._subscribers.get(topic):
+                return
+            self._pending[topic] = factory
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                due = []
+                while not due:
+                    now = time.monotonic()
+                    wait: Optional[float] = None
+                    for topic in self._pending:
+                        ready_at = self._last_delivery.get(topic, 0.0) + self.min_interval
+                        if ready_at <= now:
+                            due.append(topic)
+                        elif wait is None or ready_at - now < wait:
+                            wait = ready_at - now
+                    if not due:
+                        self._cond.wait(wait)
+                batch = []
+                for topic in due:
+                    batch.append((topic, self._pending.pop(topic), list(self._subscribers.get(topic, ()))))
+                    self._last_delivery[topic] = now
+
+            for topic, factory, subscribers in batch:
+                try:
+                    payload = factory()
+                except Exception as e:
+                    print(f"Error building {topic} event: {e}")
+                    continue
+                for callback in subscribers:
+                    try:
+                        callback(payload)
+                    except Exception as e:
+                        print(f"Error in {topic} subscriber: {e}")
@@ -0,0 +1,94 @@
+import math
+from array import array
+from typing import List, Optional
+
+_LOST = float("nan")
+
+
+class LatencyWindow:
+    # Fixed-size ring of recent probe results for one node, stored in a
+    # C double array (8 bytes per sample); a lost probe is stored as NaN.
+    # EWMA is updated incrementally, everything else is derived from the
+    # ring on demand.
+
+    __slots__ = ("_samples", "_pos", "_count", "alpha", "ewma", "last")
+
+    def __init__(self, size: int = 32, alpha: float = 0.3):
+        self._samples = array("d", [_LOST]) * max(2, size)
+        self._pos = 0
+        self._count = 0
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.last: Optional[float] = None
+
+    def add(self, latency_ms: Optional[float]) -> None:
+        self._samples[self._pos] = _LOST if latency_ms is None else latency_ms
+        self._pos = (self._pos + 1) % len(self._samples)
+        if self._count < len(self._samples):
+            self._count += 1
+        self.last = latency_ms
+        if latency_ms is not None:
+            if self.ewma is None:
+                self.ewma = latency_ms
+            else:
+                self.ewma += self.alpha * (latency_ms - self.ewma)
+
+    def _ordered(self):
+        # Oldest to newest
+        size = len(self._samples)
+        start = (self._pos - self._count) % size
+        return (self._samples[(start + i) % size] for i in range(self._count))
+
+    def samples(self) -> List[Optional[float]]:
+        # Oldest to newest, None for a lost probe
+        return [None if math.isnan(s) else s for s in self._ordered()]
+
+    def restore(self, samples: List[Optional[float]], ewma: Optional[float]) -> None:
+        for s in samples[-len(self._samples):]:
+            self.add(s)
+        self.ewma = ewma
+
+    def loss_rate(self) -> float:
+        if not self._count:
+            return 0.0
+        lost = sum(1 for s in self._ordered() if math.isnan(s))
+        return lost / self._count
+
+    def consecutive_losses(self) -> int:
+        n = 0
+        size = len(self._samples)
+        for i in range(1, self._count + 1):
+            if not math.isnan(self._samples[(self._pos - i) % size]):
+                break
+            n += 1
+        return n
+
+    def jitter(self) -> Optional[float]:
+        # Mean absolute difference between consecutive successful samples
+        prev = None
+        total = 0.0
+        n = 0
+        for s in self._ordered():
+            if math.isnan(s):
+                continue
+            if prev is not None:
+                total += abs(s - prev)
+                n += 1
+            prev = s
+        return total / n if n else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        ok = sorted(s for s in self._ordered() if not math.isnan(s))
+        if not ok:
+            return None
+        rank = max(0, math.ceil(p / 100.0 * len(ok)) - 1)
+        return ok[rank]
+
+    def effective(self) -> Optional[float]:
+        # What node selection ranks by: smoothed latency plus jitter,
+        # inflated by packet loss (a node losing half its probes counts as
+        # twice as slow).
+        if self.ewma is None:
+            return None
+        loss = min(self.loss_rate(), 0.9)
+        return (self.ewma + (self.jitter() or 0.0)) / (1.0 - loss)
@@ -0,0 +1,134 @@
+import socket
+from typing import NamedTuple, Optional, Tuple
+
+# Minimal Minecraft Java protocol helpers: enough to build a status-ping
+# handshake and to parse the first packets a client sends.
+
+STATE_STATUS = 1
+STATE_LOGIN = 2
+
+PACKET_STATUS = 0x00
+PACKET_PING = 0x01
+
+LEGACY_PING = 0xFE
+
+# Longest legal handshake: id + protocol varint + 255-char host + port + state
+MAX_HANDSHAKE_BYTES = 1 + 5 + 3 + 255 * 4 + 2 + 5 + 5
+
+
+class Handshake(NamedTuple):
+    protocol: int
+    address: str
+    port: int
+    next_state: int
+
+
+def pack_varint(d: int) -> bytes:
+    d &= 0xFFFFFFFF
+    o = b''
+    while True:
+        b = d & 0x7F
+        d >>= 7
+        o += bytes([b | (0x80 if d > 0 else 0)])
+        if d == 0:
+            break
+    return o
+
+
+def pack_string(text: str) -> bytes:
+    d = text.encode('utf8')
+    return pack_varint(len(d)) + d
+
+
+def pack_packet(packet_id: int, payload: bytes = b'') -> bytes:
+    body = pack_varint(packet_id) + payload
+    return pack_varint(len(body)) + body
+
+
+def build_handshake(host: str, port: int, protocol: int = 47, next_state: int = STATE_STATUS) -> bytes:
+    return pack_packet(
+        0x00,
+        pack_varint(protocol) + pack_string(host) + int(port).to_bytes(2, 'big') + pack_varint(next_state),
+    )
+
+
+def read_varint(buf: bytes, pos: int = 0) -> Optional[Tuple[int, int]]:
+    # Returns (value, new_pos), or None if buf ends mid-varint.
+    value = 0
+    for i in range(5):
+        if pos + i >= len(buf):
+            return None
+        b = buf[pos + i]
+        value |= (b & 0x7F) << (7 * i)
+        if not b & 0x80:
+            if value & 0x80000000:
+                value -= 1 << 32
+            return value, pos + i + 1
+    raise ValueError("varint too long")
+
+
+def split_packet(buf: bytes, pos: int = 0) -> Optional[Tuple[int, bytes, int]]:
+    # Returns (packet_id, payload, end_pos), or None if incomplete.
+    r = read_varint(buf, pos)
+    if r is None:
+        return None
+    length, body_start = r
+    if length <= 0:
+        raise ValueError("bad packet length")
+    end = body_start + length
+    if end > len(buf):
+        return None
+    r = read_varint(buf, body_start)
+    if r is None:
+        raise ValueError("truncated packet id")
+    packet_id, payload_start = r
+    return packet_id, bytes(buf[payload_start:end]), end
+
+
+def parse_handshake(buf: bytes) -> Optional[Tuple[Handshake, int]]:
+    # Returns (handshake, end_pos), or None if more bytes are needed.
+    pkt = split_packet(buf)
+    if pkt is None:
+        if len(buf) > MAX_HANDSHAKE_BYTES:
+            raise ValueError("handshake too long")
+        return None
+    packet_id, payload, end = pkt
+    if packet_id != 0x00:
+        raise ValueError("not a handshake")
+    r = read_varint(payload)
+    if r is None:
+        raise ValueError("truncated handshake")
+    protocol, pos = r
+    r = read_varint(payload, pos)
+    if r is None:
+        raise ValueError("truncated handshake")
+    host_len, pos = r
+    if host_len < 0 or pos + host_len + 2 > len(payload):
+        raise ValueError("truncated handshake")
+    address = payload[pos:pos + host_len].decode('utf8', 'replace')
+    pos += host_len
+    port = int.from_bytes(payload[pos:pos + 2], 'big')
+    r = read_varint(payload, pos + 2)
+    if r is None:
+        raise ValueError("truncated handshake")
+    return Handshake(protocol, address, port, r[0]), end
+
+
+def recv_packet(sock: socket.socket, initial: bytes = b'') -> Tuple[int, bytes]:
+    buf = initial
+    while True:
+        pkt = split_packet(buf)
+        if pkt is not None:
+            return pkt[0], pkt[1]
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("connection closed mid-packet")
+        buf += chunk
+
+
+def decode_string(payload: bytes) -> str:
+    r = read_varint(payload)
+    if r is None:
+        raise ValueError("truncated string")
+    length, pos = r
+    return payload[pos:pos + length].decode('utf8')
@@ -0,0 +1,121 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+# Response header carrying the list version; sent back as ?since=<version>
+# so the server can answer with only what changed.
+VERSION_HEADER = "X-Nodes-Version"
+
+
+def _item_key(item: dict) -> str:
+    return item.get("hostname") or item.get("name", "")
+
+
+class NodeFeed:
+    # Conditional, optionally incremental download of the node list.
+    #   - ETag / Last-Modified from the last response are sent back as
+    #     If-None-Match / If-Modified-Since, so an unchanged list costs a 304
+    #   - if the server reports a version (X-Nodes-Version header) and
+    #     delta_enabled is on, the next request asks for ?since=<version>;
+    #     the server may answer with a delta object
+    #         {"version": 7, "added": [...], "changed": [...], "removed": ["hostname", ...]}
+    #     or simply send the full array again
+    # A server that knows none of this keeps returning a plain array, which
+    # is handled exactly as before. Raw items are kept by hostname so deltas
+    # can be applied on top of them.
+
+    def __init__(self, timeout: float = 5.0, delta_enabled: bool = True):
+        self.timeout = timeout
+        self.delta_enabled = delta_enabled
+        self._session = requests.Session()
+        self._url: Optional[str] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self.version: Optional[str] = None
+        self._items: Dict[str, dict] = {}
+
+    def reset(self) -> None:
+        self._etag = None
+        self._last_modified = None
+        self.version = None
+        self._items = {}
+
+    def state(self) -> Dict[str, Any]:
+        # Validators only; the items themselves are saved by the caller
+        return {
+            "url": self._url,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "version": self.version,
+        }
+
+    def restore(self, state: Dict[str, Any], items: List[dict]) -> None:
+        # Picks up from a saved state() and the items it described
+        self._url = state.get("url")
+        self._etag = state.get("etag")
+        self._last_modified = state.get("last_modified")
+        self.version = state.get("version")
+        self._items = {_item_key(item): item for item in items}
+
+    def fetch(self, url: str) -> Optional[List[dict]]:
+        # Returns every raw item if the list changed, None if it did not.
+        if url != self._url:
+            self.reset()
+            self._url = url
+
+        headers = {}
+        params = {}
+        if self._items:
+            # Only conditional while we still hold the list it refers to
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+            if self.delta_enabled and self.version is not None:
+                params["since"] = self.version
+
+        resp = self._session.get(url, headers=headers, params=params, timeout=self.timeout)
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+        body = resp.json()
+
+        if isinstance(body, dict):
+            changed = self._apply_delta(body)
+            version = body.get("version")
+        else:
+            self._items = {_item_key(item): item for item in body}
+            changed = True
+            version = None
+
+        self._etag = resp.headers.get("ETag")
+        self._last_modified = self._valid_date(resp.headers.get("Last-Modified"))
+        version = resp.headers.get(VERSION_HEADER, version)
+        self.version = str(version) if version is not None else None
+        return list(self._items.values()) if changed else None
+
+    def _apply_delta(self, body: dict) -> bool:
+        if "nodes" in body:
+            # Server chose to send everything (e.g. `since` was too old)
+            self._items = {_item_key(item): item for item in body["nodes"]}
+            return True
+        changed = False
+        for item in body.get("added", []) + body.get("changed", []):
+            self._items[_item_key(item)] = item
+            changed = True
+        for hostname in body.get("removed", []):
+            if self._items.pop(hostname, None) is not None:
+                changed = True
+        return changed
+
+    @staticmethod
+    def _valid_date(value: Optional[str]) -> Optional[str]:
+        # Echo Last-Modified back verbatim, but only if it parses
+        if not value:
+            return None
+        try:
+            parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return value
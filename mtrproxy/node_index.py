@@ -0,0 +1,129 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .types import NodeInfo
+
+_UNRANKED = float("inf")
+# Sorts after any hostname, for "everything at or below this rank" bisects
+_LAST_NAME = "\U0010ffff"
+
+Key = Tuple[float, str]
+
+
+def node_rank(node: NodeInfo) -> float:
+    # Lower is better: jitter- and loss-adjusted latency when known.
+    # Unreachable and unmeasured nodes rank last.
+    if not node.reachable or node.latency_ms is None:
+        return _UNRANKED
+    if node.effective_latency_ms is not None:
+        return node.effective_latency_ms
+    return node.latency_ms
+
+
+class NodeIndex:
+    # Nodes kept ordered by rank, overall and per group, as sorted lists of
+    # (rank, hostname). A probe result moves one node with two bisects
+    # instead of re-sorting everything, and best / top-N / threshold
+    # queries only touch the front of a list. Priority order (what the
+    # table shows) only changes with the node list itself, so it is rebuilt
+    # in replace() rather than on every update.
+    #
+    # Not thread-safe; NodeManager calls it under its own lock.
+
+    def __init__(self):
+        self._nodes: Dict[str, NodeInfo] = {}
+        self._keys: Dict[str, Key] = {}
+        self._group_of: Dict[str, str] = {}
+        self._order: List[Key] = []
+        self._groups: Dict[str, List[Key]] = {}
+        self._by_priority: List[NodeInfo] = []
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def replace(self, nodes: Iterable[NodeInfo]) -> None:
+        # Brings the index in line with a new node list; nodes that are
+        # still there and have not moved are left alone.
+        nodes = list(nodes)
+        wanted = {n.hostname for n in nodes}
+        for hostname in [h for h in self._nodes if h not in wanted]:
+            self._discard(hostname)
+        for node in nodes:
+            self.update(node)
+        self._by_priority = sorted(nodes, key=lambda n: n.priority)
+
+    def update(self, node: NodeInfo) -> None:
+        # Call after the node's latency fields (or the node object) changed
+        key = (node_rank(node), node.hostname)
+        old = self._keys.get(node.hostname)
+        if old == key and self._nodes.get(node.hostname) is node and self._group_of[node.hostname] == node.group:
+            return
+        if old is not None:
+            self._unlink(node.hostname, old)
+        self._nodes[node.hostname] = node
+        self._keys[node.hostname] = key
+        self._group_of[node.hostname] = node.group
+        insort(self._order, key)
+        insort(self._groups.setdefault(node.group, []), key)
+
+    def remove(self, hostname: str) -> None:
+        if self._discard(hostname):
+            self._by_priority = [n for n in self._by_priority if n.hostname != hostname]
+
+    def _discard(self, hostname: str) -> bool:
+        key = self._keys.pop(hostname, None)
+        if key is None:
+            return False
+        self._unlink(hostname, key)
+        del self._nodes[hostname]
+        del self._group_of[hostname]
+        return True
+
+    def _unlink(self, hostname: str, key: Key) -> None:
+        del self._order[bisect_left(self._order, key)]
+        group = self._group_of[hostname]
+        keys = self._groups[group]
+        del keys[bisect_left(keys, key)]
+        if not keys:
+            del self._groups[group]
+
+    def _keys_for(self, group: Optional[str]) -> List[Key]:
+        if group is None:
+            return self._order
+        return self._groups.get(group, [])
+
+    def best(self, group: Optional[str] = None, exclude: Optional[NodeInfo] = None) -> Optional[NodeInfo]:
+        found = self.top(1, group, exclude)
+        return found[0] if found else None
+
+    def top(self, n: int, group: Optional[str] = None, exclude: Optional[NodeInfo] = None) -> List[NodeInfo]:
+        # Up to n reachable, measured nodes, best first
+        result: List[NodeInfo] = []
+        for rank, hostname in self._keys_for(group):
+            if len(result) >= n or rank == _UNRANKED:
+                break
+            node = self._nodes[hostname]
+            if node is not exclude:
+                result.append(node)
+        return result
+
+    def within(self, max_rank: float, group: Optional[str] = None) -> List[NodeInfo]:
+        # Every reachable node ranked at or below max_rank, best first
+        keys = self._keys_for(group)
+        end = bisect_right(keys, (min(max_rank, _UNRANKED), _LAST_NAME))
+        return [self._nodes[h] for rank, h in keys[:end] if rank != _UNRANKED]
+
+    def group_bests(self) -> Dict[str, NodeInfo]:
+        # Best reachable node of each group that has one
+        result = {}
+        for group, keys in self._groups.items():
+            if keys[0][0] != _UNRANKED:
+                result[group] = self._nodes[keys[0][1]]
+        return result
+
+    def ordered(self) -> List[NodeInfo]:
+        # Every node, best first, unreachable / unmeasured last
+        return [self._nodes[h] for _, h in self._order]
+
+    def by_priority(self) -> List[NodeInfo]:
+        return list(self._by_priority)
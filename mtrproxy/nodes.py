@@ -1,9 +1,30 @@
 import threading
 import time
-from typing import Callable, Dict, List, Optional
-import requests
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 import socket
-from .types import NodeInfo
+from . import mcproto
+from .events import TOPIC_NODES_UPDATED, EventBus
+from .latency_stats import LatencyWindow
+from .node_feed import NodeFeed
+from .node_index import NodeIndex, node_rank
+from .probe import ProbeEngine
+from .scheduler import ProbeScheduler
+from .snapshot import load_snapshot, save_snapshot
+from .status_cache import StatusCache
+from .switching import REASON_MANUAL, SwitchPolicy
+from .types import NodeInfo, ProbeTiming, SwitchRecord
+
+# "first-byte" times connect + handshake + the first status byte (the old
+# behaviour); "ping" reads the whole status response and then times
+# ping/pong round-trips on the open connection.
+PROBE_FIRST_BYTE = "first-byte"
+PROBE_PING = "ping"
+
+
+def _ms(ns: int) -> float:
+    return ns / 1e6
+
 
 class NodeManager:
     def __init__(
@@ -13,19 +34,85 @@ class NodeManager:
         auto_detect_enabled: bool,
         on_nodes_updated: Optional[Callable[[List[NodeInfo]], None]] = None,
         on_best_node_changed: Optional[Callable[[Optional[NodeInfo]], None]] = None,
+        event_bus: Optional[EventBus] = None,
+        status_cache_ttl: float = 30.0,
+        probe_concurrency: int = 64,
+        probe_deadline_seconds: float = 15.0,
+        probe_timeout_seconds: float = 2.0,
+        latency_window_size: int = 32,
+        unreachable_after_losses: int = 2,
+        probe_rate_per_second: float = 20.0,
+        probe_hot_count: int = 3,
+        probe_hot_interval_seconds: float = 10.0,
+        probe_max_backoff_seconds: float = 600.0,
+        switch_min_improvement_ms: float = 10.0,
+        switch_min_improvement_ratio: float = 0.15,
+        switch_min_dwell_seconds: float = 60.0,
+        switch_confirm_rounds: int = 3,
+        on_node_switched: Optional[Callable[[SwitchRecord], None]] = None,
+        probe_mode: str = PROBE_PING,
+        probe_ping_count: int = 3,
+        node_delta_enabled: bool = True,
+        snapshot_path: Optional[Path] = None,
+        snapshot_interval_seconds: float = 30.0,
     ):
         self.remote_api = remote_api
         self.detect_interval_seconds = detect_interval_seconds
         self.auto_detect_enabled = auto_detect_enabled
         self.on_nodes_updated = on_nodes_updated
         self.on_best_node_changed = on_best_node_changed
+        self.on_node_switched = on_node_switched
+        self._events = event_bus or EventBus()
+        self._feed = NodeFeed(timeout=5, delta_enabled=node_delta_enabled)
+        # Raw API item each node was built from; unchanged items keep their NodeInfo
+        self._node_items: Dict[str, dict] = {}
+        # Filled by detect_latency; lets the proxy answer server-list pings locally
+        self.status_cache = StatusCache(status_cache_ttl)
+        # Recent probe results per ip:port; NodeInfo latency fields are
+        # derived from these rather than from the last probe alone
+        self._latency: Dict[Tuple[str, int], LatencyWindow] = {}
+        self._last_timing: Dict[Tuple[str, int], ProbeTiming] = {}
+        # Handshake + status request bytes per endpoint, built once
+        self._status_requests: Dict[Tuple[str, int], bytes] = {}
+        self.probe_mode = probe_mode
+        self.probe_ping_count = max(1, probe_ping_count)
+        self.latency_window_size = latency_window_size
+        self.unreachable_after_losses = max(1, unreachable_after_losses)
+        self._switch_policy = SwitchPolicy(
+            min_improvement_ms=switch_min_improvement_ms,
+            min_improvement_ratio=switch_min_improvement_ratio,
+            min_dwell_seconds=switch_min_dwell_seconds,
+            confirm_rounds=switch_confirm_rounds,
+        )
+        self._scheduler = ProbeScheduler(
+            rate_per_second=probe_rate_per_second,
+            hot_count=probe_hot_count,
+            hot_interval=probe_hot_interval_seconds,
+            max_backoff=probe_max_backoff_seconds,
+        )
+        self._probe_engine = ProbeEngine(
+            self._measure_latency,
+            concurrency=probe_concurrency,
+            deadline_seconds=probe_deadline_seconds,
+            timeout_seconds=probe_timeout_seconds,
+        )
+        if on_nodes_updated:
+            self._events.subscribe(TOPIC_NODES_UPDATED, on_nodes_updated)
 
         self._nodes: Dict[str, NodeInfo] = {}
+        # Same nodes ordered by rank and grouped; kept in step with _nodes
+        self._index = NodeIndex()
         self._lock = threading.RLock()
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._current_node_key: Optional[str] = None
         self._manual_selected = False
+        # Last known nodes, latency history and selection, saved at most
+        # every snapshot_interval_seconds while something changed
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval_seconds = snapshot_interval_seconds
+        self._snapshot_dirty = False
+        self._snapshot_saved_at = 0.0
 
     def start(self) -> None:
         if self._thread and self._thread.is_alive():
@@ -38,68 +125,184 @@ class NodeManager:
         self._stop_event.set()
         if self._thread:
             self._thread.join(timeout=2)
+        self.save_snapshot()
 
     def _run_loop(self) -> None:
-        while not self._stop_event.is_set():
-            # No auto detect loop anymore
-            for _ in range(self.detect_interval_seconds):
-                if self._stop_event.is_set():
-                    break
-                time.sleep(1)
+        # Background probing while auto detect is on; ProbeScheduler decides
+        # what is due each second and keeps within the probe budget.
+        while not self._stop_event.wait(1):
+            # One bad tick must not end background probing and saving
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Error in node manager loop: {e}")
+
+    def _tick(self) -> None:
+        if time.monotonic() - self._snapshot_saved_at >= self.snapshot_interval_seconds:
+            self.save_snapshot()
+        if not self.auto_detect_enabled:
+            return
+        with self._lock:
+            due = self._scheduler.take_due(
+                self._ranked_nodes(),
+                self.detect_interval_seconds,
+                current=self._nodes.get(self._current_node_key) if self._current_node_key else None,
+            )
+        if due:
+            self._probe(due, auto_switch=not self._manual_selected)
+
+    def _ranked_nodes(self) -> List[NodeInfo]:
+        # Current node first, then best first; unmeasured nodes last
+        current = self._nodes.get(self._current_node_key) if self._current_node_key else None
+        others = [n for n in self._index.ordered() if n is not current]
+        return ([current] if current else []) + others
+
+    @staticmethod
+    def _parse_node(item: dict) -> NodeInfo:
+        return NodeInfo(
+            hostname=item.get("hostname") or item.get("name", ""),
+            ip=item["ip"],
+            port=int(item["port"]),
+            enabled=item.get("enabled", True),
+            group=item.get("group", "默认"),
+            priority=item.get("priority", 100),
+            motd=item.get("motd"),
+            online_count=item.get("online_count", 0),
+            socket_profile=item.get("socket_profile"),
+            bedrock_port=item.get("bedrock_port"),
+        )
 
     def fetch_nodes_from_remote(self) -> List[NodeInfo]:
         try:
-            resp = requests.get(self.remote_api, timeout=5)
-            resp.raise_for_status()
-            arr = resp.json()
-            nodes: List[NodeInfo] = []
-            for item in arr:
-                enabled = item.get("enabled", True)
-                if not enabled:
-                    continue
-                nodes.append(
-                    NodeInfo(
-                        hostname=item.get("hostname") or item.get("name", ""),
-                        ip=item["ip"],
-                        port=int(item["port"]),
-                        enabled=enabled,
-                        group=item.get("group", "默认"),
-                        priority=item.get("priority", 100),
-                        motd=item.get("motd"),
-                        online_count=item.get("online_count", 0),
-                    )
-                )
-            with self._lock:
-                # Update existing nodes but preserve latency if possible, or just overwrite
-                # If we overwrite, we lose current latency until next ping. Let's just overwrite for simplicity or merge.
-                # Merging is better to keep latency info if IP/port hasn't changed.
-                new_nodes = {}
-                for n in nodes:
-                    if n.hostname in self._nodes:
-                        old = self._nodes[n.hostname]
-                        if old.ip == n.ip and old.port == n.port:
-                            n.latency_ms = old.latency_ms
-                            n.reachable = old.reachable
-                            n.status = old.status
-                    new_nodes[n.hostname] = n
-                self._nodes = new_nodes
-            
+            # None means the server answered 304 or an empty delta
+            items = self._feed.fetch(self.remote_api)
+            if items is None:
+                return self.list_nodes()
+            nodes = self._apply_items(items)
             self._notify_nodes_updated()
             return nodes
         except Exception as e:
+            # Next fetch asks for the full list again
+            self._feed.reset()
             # In a real app, log this
             print(f"Error fetching nodes: {e}")
             return []
 
-    def _notify_nodes_updated(self) -> None:
-        if self.on_nodes_updated:
+    def _apply_items(self, items: List[dict]) -> List[NodeInfo]:
+        with self._lock:
+            # Nodes whose API item is unchanged are kept as they are;
+            # latency history is kept per ip:port, so it also survives
+            # for rebuilt nodes as long as the endpoint is unchanged.
+            new_nodes = {}
+            new_items = {}
+            for item in items:
+                if not item.get("enabled", True):
+                    continue
+                hostname = item.get("hostname") or item.get("name", "")
+                node = self._nodes.get(hostname)
+                if node is None or self._node_items.get(hostname) != item:
+                    node = self._parse_node(item)
+                    self._fill_latency_stats(node)
+                new_nodes[hostname] = node
+                new_items[hostname] = item
+            self._nodes = new_nodes
+            self._node_items = new_items
+            self._index.replace(new_nodes.values())
+            endpoints = {(n.ip, n.port) for n in new_nodes.values()}
+            for key in list(self._latency):
+                if key not in endpoints:
+                    del self._latency[key]
+                    self._last_timing.pop(key, None)
+            for key in list(self._status_requests):
+                if key not in endpoints:
+                    del self._status_requests[key]
+            self._snapshot_dirty = True
+            return list(new_nodes.values())
+
+    def load_snapshot(self) -> bool:
+        # Restores the last saved nodes, latency history and selection, so
+        # connections can be routed before the first fetch and probe round.
+        # Returns False if there was nothing usable to load.
+        if not self.snapshot_path:
+            return False
+        data = load_snapshot(self.snapshot_path)
+        if not data:
+            return False
+        try:
+            with self._lock:
+                for ip, port, samples, ewma in data.get("latency", []):
+                    window = LatencyWindow(self.latency_window_size)
+                    window.restore(samples, ewma)
+                    self._latency[(ip, int(port))] = window
+                items = data.get("items", [])
+                self._feed.restore(data.get("feed", {}), items)
+                nodes = self._apply_items(items)
+                current = data.get("current")
+                if current in self._nodes:
+                    self._current_node_key = current
+                    self._manual_selected = bool(data.get("manual"))
+                    self._switch_policy.note_selected()
+                self._snapshot_dirty = False
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Error loading node snapshot: {e}")
             with self._lock:
-                nodes = list(self._nodes.values())
-            self.on_nodes_updated(nodes)
+                self._nodes = {}
+                self._node_items = {}
+                self._index.replace([])
+                self._latency = {}
+                self._feed.reset()
+            return False
+        self._notify_nodes_updated()
+        return bool(nodes)
+
+    def save_snapshot(self) -> None:
+        # Only writes when something changed since the last save
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            if not self._snapshot_dirty:
+                return
+            self._snapshot_dirty = False
+            self._snapshot_saved_at = time.monotonic()
+            data = {
+                "saved_at": time.time(),
+                # The applied list, not the feed's cache: a failed fetch
+                # clears the latter, and it is updated outside our lock
+                "items": list(self._node_items.values()),
+                "feed": self._feed.state(),
+                "current": self._current_node_key,
+                "manual": self._manual_selected,
+                "latency": [
+                    [ip, port, window.samples(), window.ewma]
+                    for (ip, port), window in self._latency.items()
+                ],
+            }
+        try:
+            save_snapshot(self.snapshot_path, data)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error saving node snapshot: {e}")
+
+    def _notify_nodes_updated(self) -> None:
+        self._events.publish(TOPIC_NODES_UPDATED, factory=self.list_nodes)
 
     def list_nodes(self) -> List[NodeInfo]:
+        # By priority, the order the table shows them in
         with self._lock:
-            return list(self._nodes.values())
+            return self._index.by_priority()
+
+    def best_nodes(self, limit: int, group: Optional[str] = None) -> List[NodeInfo]:
+        # Reachable nodes, best first, optionally within one group
+        with self._lock:
+            return self._index.top(limit, group)
+
+    def nodes_within(self, max_latency_ms: float, group: Optional[str] = None) -> List[NodeInfo]:
+        # Reachable nodes whose effective latency is at most max_latency_ms
+        with self._lock:
+            return self._index.within(max_latency_ms, group)
+
+    def best_per_group(self) -> Dict[str, NodeInfo]:
+        with self._lock:
+            return self._index.group_bests()
 
     def get_current_node(self) -> Optional[NodeInfo]:
         with self._lock:
@@ -107,68 +310,154 @@ class NodeManager:
                 return None
             return self._nodes.get(self._current_node_key)
 
+    def get_candidate_nodes(self, limit: int) -> List[NodeInfo]:
+        # Current node first, then the other reachable nodes by latency. A
+        # manual selection is a hard pin, so it gets no alternatives.
+        with self._lock:
+            current = self._nodes.get(self._current_node_key) if self._current_node_key else None
+            if self._manual_selected:
+                return [current] if current else []
+            others = self._index.top(max(1, limit), exclude=current)
+        result = [current] if current and current.reachable else []
+        return (result + others)[:max(1, limit)]
+
     def manual_select_node(self, hostname: str) -> Optional[NodeInfo]:
         with self._lock:
             node = self._nodes.get(hostname)
+            record = None
             if node:
+                if hostname != self._current_node_key:
+                    record = self._switch_policy.record(self._current_node_key, hostname, REASON_MANUAL)
                 self._current_node_key = hostname
                 self._manual_selected = True
+                self._snapshot_dirty = True
+        if record and self.on_node_switched:
+            self.on_node_switched(record)
         if self.on_best_node_changed:
             self.on_best_node_changed(self.get_current_node())
         return self.get_current_node()
 
+    def switch_history(self) -> List[SwitchRecord]:
+        with self._lock:
+            return self._switch_policy.recent()
+
     def clear_manual_select(self) -> None:
         with self._lock:
             self._manual_selected = False
+            self._snapshot_dirty = True
 
     def detect_latency(self, node: NodeInfo, timeout: float = 2.0) -> NodeInfo:
-        start = time.time()
-        reachable = False
+        self._record_latency(node.ip, node.port, self._measure_latency(node.ip, node.port, timeout))
+        self._fill_latency_stats(node)
+        return node
+
+    def _status_request(self, ip: str, port: int) -> bytes:
+        request = self._status_requests.get((ip, port))
+        if request is None:
+            # Handshake (protocol 47 / 1.8, next state: status) + status request
+            request = mcproto.build_handshake(ip, port) + mcproto.pack_packet(mcproto.PACKET_STATUS)
+            self._status_requests[(ip, port)] = request
+        return request
+
+    def _measure_latency(self, ip: str, port: int, timeout: float) -> Optional[ProbeTiming]:
+        # Returns the probe's timings, or None if unreachable. Touches no
+        # NodeInfo, so the probe engine can abandon it safely.
+        start = time.monotonic_ns()
+        try:
+            s = socket.create_connection((ip, port), timeout=timeout)
+        except OSError:
+            return None
         try:
-            # MC Ping Logic
-            s = socket.create_connection((node.ip, node.port), timeout=timeout)
-            
-            def pack_varint(d):
-                o = b''
-                while True:
-                    b = d & 0x7F
-                    d >>= 7
-                    o += bytes([b | (0x80 if d > 0 else 0)])
-                    if d == 0: break
-                return o
-
-            def pack_string(text):
-                d = text.encode('utf8')
-                return pack_varint(len(d)) + d
-
-            # 1. Handshake
-            # Packet ID 0x00, Protocol 47 (1.8), Host, Port, NextState 1 (Status)
-            handshake_payload = (
-                b'\x00' + 
-                pack_varint(47) + 
-                pack_string(node.ip) + 
-                int(node.port).to_bytes(2, 'big') + 
-                pack_varint(1)
+            connected = time.monotonic_ns()
+            s.sendall(self._status_request(ip, port))
+            if self.probe_mode != PROBE_PING:
+                # First byte of the response length implies data arrived
+                first = s.recv(1)
+                answered = time.monotonic_ns()
+                if not first:
+                    return None
+                try:
+                    self._cache_status(ip, port, *mcproto.recv_packet(s, first))
+                except (OSError, ValueError):
+                    pass
+                return ProbeTiming(_ms(answered - start), _ms(connected - start), _ms(answered - connected))
+
+            packet_id, payload = mcproto.recv_packet(s)
+            answered = time.monotonic_ns()
+            self._cache_status(ip, port, packet_id, payload)
+            status_ms = _ms(answered - connected)
+            rtt = self._ping_rtt(s)
+            return ProbeTiming(
+                latency_ms=rtt if rtt is not None else status_ms,
+                connect_ms=_ms(connected - start),
+                status_ms=status_ms,
+                rtt_ms=rtt,
             )
-            s.send(pack_varint(len(handshake_payload)) + handshake_payload)
+        except (OSError, ValueError):
+            return None
+        finally:
+            s.close()
 
-            # 2. Request Status
-            # Packet ID 0x00
-            request_payload = b'\x00'
-            s.send(pack_varint(len(request_payload)) + request_payload)
+    def _cache_status(self, ip: str, port: int, packet_id: int, payload: bytes) -> None:
+        # Keep the response for the proxy's server-list cache
+        if packet_id == mcproto.PACKET_STATUS:
+            try:
+                self.status_cache.put(ip, port, mcproto.decode_string(payload))
+            except ValueError:
+                pass
 
-            # 3. Wait for response
-            # Read response length (VarInt) - first byte implies data arrived
-            s.recv(1) 
-            
-            s.close()
-            reachable = True
-        except Exception:
-            reachable = False
-        
-        end = time.time()
-        latency = (end - start) * 1000 if reachable else None
-        node.latency_ms = latency
+    def _ping_rtt(self, s: socket.socket) -> Optional[float]:
+        # Lowest of probe_ping_count ping/pong round-trips: pure network RTT
+        # plus the server's packet handling, without TCP setup or status
+        # JSON generation. Vanilla servers close after the first pong, so
+        # fewer rounds may complete; None if the server never answers.
+        best: Optional[int] = None
+        for _ in range(self.probe_ping_count):
+            sent = time.monotonic_ns()
+            token = (sent & 0x7FFFFFFFFFFFFFFF).to_bytes(8, "big")
+            try:
+                s.sendall(mcproto.pack_packet(mcproto.PACKET_PING, token))
+                packet_id, payload = mcproto.recv_packet(s)
+            except (OSError, ValueError):
+                break
+            rtt = time.monotonic_ns() - sent
+            if packet_id != mcproto.PACKET_PING or payload != token:
+                break
+            if best is None or rtt < best:
+                best = rtt
+        return _ms(best) if best is not None else None
+
+    def _record_latency(self, ip: str, port: int, timing: Optional[ProbeTiming]) -> None:
+        with self._lock:
+            window = self._latency.get((ip, port))
+            if window is None:
+                window = self._latency[(ip, port)] = LatencyWindow(self.latency_window_size)
+            window.add(timing.latency_ms if timing else None)
+            self._snapshot_dirty = True
+            if timing:
+                self._last_timing[(ip, port)] = timing
+            self._scheduler.record((ip, port), timing is not None)
+
+    def _fill_latency_stats(self, node: NodeInfo) -> None:
+        with self._lock:
+            window = self._latency.get((node.ip, node.port))
+            if window is None:
+                return
+            latency = window.ewma
+            # One lost probe is noise; several in a row means it is down
+            reachable = latency is not None and window.consecutive_losses() < self.unreachable_after_losses
+            node.latency_ms = latency
+            node.last_sample_ms = window.last
+            node.jitter_ms = window.jitter()
+            node.loss_rate = window.loss_rate()
+            node.latency_p50_ms = window.percentile(50)
+            node.latency_p95_ms = window.percentile(95)
+            node.effective_latency_ms = window.effective()
+            timing = self._last_timing.get((node.ip, node.port))
+            if timing:
+                node.connect_ms = timing.connect_ms
+                node.status_ms = timing.status_ms
+                node.rtt_ms = timing.rtt_ms
         node.reachable = reachable
         if not reachable:
             node.status = "unreachable"
@@ -178,36 +467,48 @@ class NodeManager:
             node.status = "normal"
         else:
             node.status = "slow"
-        return node
+        with self._lock:
+            if self._nodes.get(node.hostname) is node:
+                self._index.update(node)
 
     def detect_all_nodes(self, auto_switch: bool) -> None:
         with self._lock:
             nodes = list(self._nodes.values())
-        
-        # Parallel detection could be faster, but let's stick to simple sequential or threaded
-        # The original code used threads for pinging. Let's do that.
-        threads = []
-        for n in nodes:
-            t = threading.Thread(target=self.detect_latency, args=(n,))
-            t.start()
-            threads.append(t)
-        for t in threads:
-            t.join()
+        self._probe(nodes, auto_switch)
+
+    def _probe(self, nodes: List[NodeInfo], auto_switch: bool) -> None:
+        def on_result(group: List[NodeInfo], timing: Optional[ProbeTiming]) -> None:
+            self._record_latency(group[0].ip, group[0].port, timing)
+            for n in group:
+                self._fill_latency_stats(n)
+            # Coalesced by the event bus, so the table fills in as results land
+            self._notify_nodes_updated()
+
+        self._probe_engine.run(nodes, on_result, self._stop_event)
 
+        # Pick from every node, not just the ones probed this round, and
+        # let the switch policy decide whether it is worth moving
         best: Optional[NodeInfo] = None
-        for n in nodes:
-            if n.reachable and n.latency_ms is not None:
-                if not best or n.latency_ms < best.latency_ms:
-                    best = n
-        
+        record: Optional[SwitchRecord] = None
         with self._lock:
-            # Nodes are objects, so they are updated in place, but we need to ensure the dict is current
-            pass
-            
-        if auto_switch and best:
-            with self._lock:
-                self._current_node_key = best.hostname
+            best = self._index.best()
+            if auto_switch and best:
+                current = self._nodes.get(self._current_node_key) if self._current_node_key else None
+                reason = self._switch_policy.evaluate(
+                    current,
+                    best,
+                    node_rank(best),
+                    node_rank(current) if current else float("inf"),
+                    {(n.ip, n.port) for n in nodes},
+                )
+                if reason:
+                    record = self._switch_policy.record(self._current_node_key, best.hostname, reason)
+                    self._current_node_key = best.hostname
+                    self._snapshot_dirty = True
+        if record:
             if self.on_best_node_changed:
                 self.on_best_node_changed(best)
+            if self.on_node_switched:
+                self.on_node_switched(record)
         
         self._notify_nodes_updated()
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .types import NodeInfo
+
+Endpoint = Tuple[str, int]
+
+# measure(ip, port, timeout) -> a measurement, or None if unreachable
+MeasureFn = Callable[[str, int, float], Any]
+
+
+class _Expired(Exception):
+    pass
+
+
+class ProbeEngine:
+    # Probes many nodes with a fixed number of worker threads instead of
+    # one thread per node, so a list of thousands neither explodes the
+    # thread count nor fires a SYN burst that skews its own timings.
+    #
+    # Nodes sharing ip:port are probed once and all get the result. Results
+    # are handed to `on_result` as each endpoint finishes. Whatever has not
+    # finished when the overall deadline passes is abandoned and its nodes
+    # keep their previous values.
+
+    def __init__(
+        self,
+        measure: MeasureFn,
+        concurrency: int = 64,
+        deadline_seconds: float = 15.0,
+        timeout_seconds: float = 2.0,
+    ):
+        self.measure = measure
+        self.concurrency = max(1, concurrency)
+        self.deadline_seconds = deadline_seconds
+        self.timeout_seconds = timeout_seconds
+
+    def run(
+        self,
+        nodes: List[NodeInfo],
+        on_result: Callable[[List[NodeInfo], Any], None],
+        stop_event: Optional[threading.Event] = None,
+    ) -> Tuple[int, int]:
+        # Returns (endpoints probed, endpoints abandoned at the deadline).
+        groups: Dict[Endpoint, List[NodeInfo]] = {}
+        for node in nodes:
+            groups.setdefault((node.ip, node.port), []).append(node)
+        if not groups:
+            return 0, 0
+
+        deadline = time.monotonic() + self.deadline_seconds
+
+        def probe(endpoint: Endpoint) -> Any:
+            # Queued probes get whatever is left of the deadline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop_event and stop_event.is_set()):
+                raise _Expired()
+            return self.measure(endpoint[0], endpoint[1], min(self.timeout_seconds, remaining))
+
+        done_count = 0
+        expired = 0
+        pool = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(groups)), thread_name_prefix="probe"
+        )
+        try:
+            pending = {pool.submit(probe, ep): ep for ep in groups}
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    endpoint = pending.pop(fut)
+                    try:
+                        result = fut.result()
+                    except _Expired:
+                        expired += 1
+                        continue
+                    except Exception:
+                        result = None
+                    done_count += 1
+                    on_result(groups[endpoint], result)
+            return done_count, expired + len(pending)
+        finally:
+            # Don't wait for stragglers; they finish within their own timeout
+            pool.shutdown(wait=False, cancel_futures=True)
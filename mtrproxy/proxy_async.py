@@ -0,0 +1,352 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+from .connect import race_connect_async
+from .proxy_core import STATUS_READ_TIMEOUT, ProxyServer
+from .sockopts import apply_socket_profile
+from .status_cache import StatusCapture, StatusResponder
+from .traffic import ConnectionStats, TrafficCounter
+from .types import NodeInfo
+
+
+class AsyncProxyServer(ProxyServer):
+    # Same start/stop/on_status contract as ProxyServer, but accept, backend
+    # connect and relay all run as coroutines on a single event loop thread
+    # instead of three OS threads per session.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        # Set by the loop thread if start_server fails
+        self._start_error: Optional[Exception] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._client_tasks: Set[asyncio.Task] = set()
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    def start(self) -> bool:
+        # True once the listener is accepting
+        with self._lock:
+            if self._server_sock:
+                return True
+            self._start_error = None
+            try:
+                self._server_sock = self._create_listener()
+                self._server_sock.setblocking(False)
+                self._stop_event.clear()
+                self._start_time = time.time()
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._loop_thread = threading.Thread(
+                    target=self._run_loop, args=(self._loop, ready), daemon=True
+                )
+                self._loop_thread.start()
+                ready.wait(timeout=2)
+                if self._start_error:
+                    # The loop thread has already closed its loop and exited
+                    self._loop_thread.join(timeout=2)
+                    self._loop = None
+                    raise self._start_error
+                self._backend_pool.start()
+                self._start_status_ticker()
+            except Exception as e:
+                print(f"Failed to start proxy: {e}")
+                if self._server_sock:
+                    self._server_sock.close()
+                self._server_sock = None
+            started = self._server_sock is not None
+        self._notify_status()
+        return started
+
+    def stop(self, drain_timeout: float = 0.0) -> None:
+        self._stop_event.set()
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+            self._server_sock = None
+        if loop and not loop.is_closed():
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_server(), loop).result(timeout=2)
+            except Exception:
+                pass
+            # Sessions keep relaying on the loop while we wait here
+            self._drain(drain_timeout)
+            try:
+                fut = asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+                fut.result(timeout=2)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+        if self._loop_thread:
+            self._loop_thread.join(timeout=2)
+            self._loop_thread = None
+        if self._status_thread:
+            self._status_thread.join(timeout=2)
+        self._backend_pool.stop()
+        self._notify_status()
+
+    def rebind(self, listen_host: Optional[str] = None, listen_port: Optional[int] = None) -> bool:
+        host = listen_host or self.listen_host
+        port = listen_port or self.listen_port
+        with self._lock:
+            old_host, old_port = self.listen_host, self.listen_port
+            loop = self._loop
+            if (host, port) == (old_host, old_port):
+                return True
+            self.listen_host, self.listen_port = host, port
+            if loop is None:
+                return True
+            try:
+                sock = self._create_listener()
+                sock.setblocking(False)
+            except OSError as e:
+                print(f"Failed to rebind proxy to {host}:{port}: {e}")
+                self.listen_host, self.listen_port = old_host, old_port
+                return False
+            try:
+                fut = asyncio.run_coroutine_threadsafe(self._swap_server(sock), loop)
+                fut.result(timeout=2)
+            except Exception as e:
+                print(f"Failed to rebind proxy to {host}:{port}: {e}")
+                sock.close()
+                self.listen_host, self.listen_port = old_host, old_port
+                return False
+            self._server_sock = sock
+        self._notify_status()
+        return True
+
+    async def _swap_server(self, sock) -> None:
+        server = await asyncio.start_server(
+            self._handle_client_async, sock=sock, limit=self._buffer_pool.buffer_size
+        )
+        old, self._server = self._server, server
+        # Server.close() only stops listening; sessions it accepted keep
+        # running. wait_closed() would wait for all of them, so skip it.
+        if old:
+            old.close()
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(
+                    self._handle_client_async,
+                    sock=self._server_sock,
+                    limit=self._buffer_pool.buffer_size,
+                )
+            )
+        except Exception as e:
+            # Reported by start(), which owns the listener
+            self._start_error = e
+            ready.set()
+            loop.close()
+            return
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _close_server(self) -> None:
+        # Stop listening only: wait_closed() would also wait for every
+        # session the server accepted.
+        if self._server:
+            self._server.close()
+            self._server = None
+
+    async def _shutdown(self) -> None:
+        await self._close_server()
+        # A stopped loop cannot keep relaying, so close sessions instead of
+        # leaving their sockets open and unserviced.
+        for writer in list(self._writers):
+            writer.close()
+        tasks = list(self._client_tasks)
+        if tasks:
+            await asyncio.wait(tasks, timeout=1)
+
+    async def _handle_client_async(
+        self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> None:
+        peer = client_writer.get_extra_info("peername")
+        ip = peer[0] if peer else ""
+        if self._admission.admit(ip):
+            client_writer.transport.abort()
+            self._notify_status()
+            return
+
+        task = asyncio.current_task()
+        self._client_tasks.add(task)
+        self._writers.add(client_writer)
+        stats = self._open_connection(peer or (ip, 0))
+        loop = asyncio.get_running_loop()
+        stats.reap = lambda: loop.call_soon_threadsafe(client_writer.transport.abort)
+        backend_writer: Optional[asyncio.StreamWriter] = None
+        pending = True
+        counted: Optional[NodeInfo] = None
+        try:
+            candidates = self._backend_candidates()
+            if not candidates:
+                return
+            node = candidates[0]
+            counted = node
+            stats.node = node
+            self._balancer.opened(node)
+
+            apply_socket_profile(client_writer.get_extra_info("socket"), self._profile_for(node))
+            initial = b""
+            fill = False
+            if self.status_cache is not None:
+                served, initial, fill = await self._serve_status_locally_async(
+                    client_reader, client_writer, node
+                )
+                if served:
+                    return
+
+            limit = self._buffer_pool.buffer_size
+            pooled = self._backend_pool.acquire(node)
+            if pooled is not None:
+                backend_reader, backend_writer = await asyncio.open_connection(
+                    sock=pooled, limit=limit
+                )
+            else:
+                backend_reader, backend_writer, node = await self._connect_backend_async(
+                    candidates, limit
+                )
+            if node is not counted:
+                self._balancer.closed(counted)
+                self._balancer.opened(node)
+                counted = node
+                stats.node = node
+            self._writers.add(backend_writer)
+            apply_socket_profile(backend_writer.get_extra_info("socket"), self._profile_for(node))
+            if initial:
+                # Replay what was read while looking for a status request
+                backend_writer.write(initial)
+                stats.up.bytes += len(initial)
+                stats.up.recvs += 1
+            if fill:
+                await self._capture_status_async(backend_reader, client_writer, node, stats)
+            self._admission.connected()
+            pending = False
+            transports = (client_writer.transport, backend_writer.transport)
+
+            def reap() -> None:
+                # Called from the status ticker thread
+                for transport in transports:
+                    loop.call_soon_threadsafe(transport.abort)
+
+            stats.reap = reap
+            await asyncio.gather(
+                self._pipe(client_reader, backend_writer, stats.up),
+                self._pipe(backend_reader, client_writer, stats.down),
+            )
+        except Exception:
+            pass
+        finally:
+            client_writer.close()
+            self._writers.discard(client_writer)
+            if backend_writer:
+                backend_writer.close()
+                self._writers.discard(backend_writer)
+            self._client_tasks.discard(task)
+            self._balancer.closed(counted)
+            self._admission.release(ip, pending)
+            self._close_connection(stats)
+
+    async def _connect_backend_async(
+        self, candidates: List[NodeInfo], limit: int
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, NodeInfo]:
+        last_error: Optional[BaseException] = None
+        remaining = list(candidates)
+        if self.connect_race_count > 1 and len(remaining) > 1:
+            racers = remaining[:self.connect_race_count]
+            remaining = remaining[self.connect_race_count:]
+            try:
+                reader, writer, node = await race_connect_async(
+                    racers,
+                    stagger=self.connect_race_stagger,
+                    timeout=max(self._connect_timeout(n) for n in racers),
+                    limit=limit,
+                    on_failure=self._health.failure,
+                )
+                self._health.success(node)
+                return reader, writer, node
+            except (OSError, asyncio.TimeoutError) as e:
+                last_error = e
+        for node in remaining:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(node.ip, node.port, limit=limit),
+                    timeout=self._connect_timeout(node),
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                last_error = e
+                self._health.failure(node)
+                continue
+            self._health.success(node)
+            return reader, writer, node
+        raise last_error or OSError("no backend node available")
+
+    async def _serve_status_locally_async(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, node: NodeInfo
+    ) -> Tuple[bool, bytes, bool]:
+        responder = StatusResponder(self.status_cache, node.ip, node.port)
+        try:
+            while True:
+                data = await asyncio.wait_for(reader.read(4096), STATUS_READ_TIMEOUT)
+                decision, reply = responder.feed(data)
+                if reply:
+                    writer.write(reply)
+                    await writer.drain()
+                if decision == StatusResponder.PASS:
+                    return False, responder.buffer, responder.fill
+                if decision == StatusResponder.DONE:
+                    return True, b"", False
+        except (OSError, asyncio.TimeoutError):
+            return True, b"", False
+        finally:
+            if responder.served:
+                with self._lock:
+                    self._status_pings_served += 1
+
+    async def _capture_status_async(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, node: NodeInfo, stats: ConnectionStats
+    ) -> None:
+        # See ProxyServer._capture_status
+        capture = StatusCapture(self.status_cache, node.ip, node.port)
+        try:
+            done = False
+            while not done:
+                data = await asyncio.wait_for(reader.read(65536), STATUS_READ_TIMEOUT)
+                done = capture.feed(data)
+                if data:
+                    writer.write(data)
+                    await writer.drain()
+                    stats.down.bytes += len(data)
+                    stats.down.recvs += 1
+        except asyncio.TimeoutError:
+            pass
+
+    async def _pipe(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, counter: TrafficCounter
+    ) -> None:
+        try:
+            while True:
+                data = await reader.read(self._buffer_pool.buffer_size)
+                if not data:
+                    break
+                counter.bytes += len(data)
+                counter.recvs += 1
+                writer.write(data)
+                # Backpressure: stop reading while the peer's send buffer is full
+                await writer.drain()
+        except OSError:
+            pass
+        finally:
+            try:
+                if writer.can_write_eof():
+                    writer.write_eof()
+            except (OSError, RuntimeError):
+                pass
@@ -1,10 +1,31 @@
 import socket
 import threading
 import time
-from typing import Callable, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+from .admission import AdmissionController, reject_socket
+from .backend_pool import BackendPool
+from .balance import BALANCE_CANDIDATES, POLICY_NONE, NodeBalancer
+from .connect import ConnectHealth, race_connect
+from .events import TOPIC_STATUS, EventBus
 from .nodes import NodeManager
-from .types import ProxyStatus, NodeInfo
+from .relay import BufferPool, DEFAULT_BUFFER_SIZE, get_forwarder
+from .sessions import Session
+from .sockopts import apply_socket_profile, resolve_profile
+from .status_cache import StatusCache, StatusCapture, StatusResponder
+from .traffic import ConnectionStats, RateMeter
+from .types import ProxyStatus, NodeInfo, SessionInfo
+
+
+# How long a new client may take to send its handshake
+STATUS_READ_TIMEOUT = 5.0
+
+
+def _shutdown_socket(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
 
 
 class ProxyServer:
@@ -14,83 +35,329 @@ class ProxyServer:
         listen_port: int,
         node_manager: NodeManager,
         on_status: Optional[Callable[[ProxyStatus], None]] = None,
+        relay_mode: str = "auto",
+        relay_buffer_size: int = DEFAULT_BUFFER_SIZE,
+        reuse_port: bool = False,
+        backend_pool_size: int = 0,
+        backend_pool_max_idle: float = 10.0,
+        connect_race_count: int = 1,
+        connect_race_stagger_ms: int = 50,
+        event_bus: Optional[EventBus] = None,
+        status_cache: Optional[StatusCache] = None,
+        max_connections: int = 0,
+        max_connections_per_ip: int = 0,
+        max_pending_connects: int = 0,
+        socket_profile: str = "default",
+        socket_profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+        node_socket_profiles: Optional[Dict[str, str]] = None,
+        connect_failover_attempts: int = 2,
+        connect_timeout_floor_ms: int = 1000,
+        connect_timeout_max_ms: int = 5000,
+        connect_timeout_rtt_multiplier: float = 4.0,
+        suspect_after_failures: int = 3,
+        suspect_cooldown_seconds: float = 30.0,
+        balance_policy: str = POLICY_NONE,
+        balance_latency_band_ms: float = 20.0,
+        idle_timeout_seconds: float = 600.0,
     ):
         self.listen_host = listen_host
         self.listen_port = listen_port
         self.node_manager = node_manager
         self.on_status = on_status
+        self._events = event_bus or EventBus()
+        if on_status:
+            self._events.subscribe(TOPIC_STATUS, on_status)
+        self.relay_mode = relay_mode
+        self._buffer_pool = BufferPool(relay_buffer_size)
+        self.reuse_port = reuse_port
+        self._backend_pool = BackendPool(
+            node_manager, size=backend_pool_size, max_idle_seconds=backend_pool_max_idle
+        )
+        self.connect_race_count = connect_race_count
+        self.connect_race_stagger = connect_race_stagger_ms / 1000.0
+        self.status_cache = status_cache
+        self._admission = AdmissionController(
+            max_connections, max_connections_per_ip, max_pending_connects
+        )
+        self.socket_profile = socket_profile
+        self.socket_profiles = socket_profiles or {}
+        self.node_socket_profiles = node_socket_profiles or {}
+        self.connect_failover_attempts = max(0, connect_failover_attempts)
+        self.connect_timeout_floor = connect_timeout_floor_ms / 1000.0
+        self.connect_timeout_max = connect_timeout_max_ms / 1000.0
+        self.connect_timeout_rtt_multiplier = connect_timeout_rtt_multiplier
+        self._health = ConnectHealth(suspect_after_failures, suspect_cooldown_seconds)
+        self._balancer = NodeBalancer(balance_policy, balance_latency_band_ms)
+        # Relaying sessions with no traffic either way for this long are
+        # closed by the status ticker; 0 disables
+        self.idle_timeout = idle_timeout_seconds
 
         self._server_sock: Optional[socket.socket] = None
         self._accept_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
         self._lock = threading.RLock()
-        self._active_connections = 0
+        # Notified whenever a session closes, so stop() can wait for a drain
+        self._sessions_changed = threading.Condition(self._lock)
         self._start_time: Optional[float] = None
+        self._status_thread: Optional[threading.Thread] = None
+
+        # Live sessions; their traffic is summed on demand and finished ones
+        # are folded into _closed_traffic (bytes_up, bytes_down, recvs_up,
+        # recvs_down).
+        self._sessions: Set[Session] = set()
+        self._closed_traffic = [0, 0, 0, 0]
+        self._rate_meter = RateMeter()
+        self._status_pings_served = 0
+        self._reaped_sessions = 0
 
-    def start(self) -> None:
+    def is_running(self) -> bool:
+        with self._lock:
+            return self._server_sock is not None
+
+    def start(self) -> bool:
+        # True once the listener is accepting
         with self._lock:
             if self._server_sock:
-                return
+                return True
             try:
-                self._server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self._server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self._server_sock.bind((self.listen_host, self.listen_port))
-                self._server_sock.listen(128)
+                self._server_sock = self._create_listener()
                 self._stop_event.clear()
                 self._start_time = time.time()
                 self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
                 self._accept_thread.start()
+                self._backend_pool.start()
+                self._start_status_ticker()
             except Exception as e:
                 print(f"Failed to start proxy: {e}")
                 if self._server_sock:
                     self._server_sock.close()
                 self._server_sock = None
+            started = self._server_sock is not None
+        self._notify_status()
+        return started
+
+    def _start_status_ticker(self) -> None:
+        # Periodic status so uptime and throughput refresh between connects
+        self._rate_meter.reset()
+        self._status_thread = threading.Thread(target=self._status_loop, daemon=True)
+        self._status_thread.start()
+
+    def _status_loop(self) -> None:
+        while not self._stop_event.wait(1):
+            self._reap_idle()
+            self._notify_status()
+
+    def _reap_idle(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                stats for stats in self._sessions
+                if stats.reap and stats.idle_for(now) >= self.idle_timeout
+            ]
+            self._reaped_sessions += len(idle)
+        for stats in idle:
+            reap, stats.reap = stats.reap, None
+            reap()
+
+    def _create_listener(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind((self.listen_host, self.listen_port))
+            sock.listen(128)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _close_listener(sock: socket.socket) -> None:
+        # close() alone does not wake a thread blocked in accept() on Linux,
+        # and the port stays bound until it returns; shutdown() does wake it.
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def rebind(self, listen_host: Optional[str] = None, listen_port: Optional[int] = None) -> bool:
+        # Move the listener to a new address without touching live sessions:
+        # the new socket is bound while the old one still accepts, swapped
+        # in, and only then is the old one closed. In-flight relays keep
+        # their client and backend sockets. If the new address cannot be
+        # bound the old listener stays as it was.
+        host = listen_host or self.listen_host
+        port = listen_port or self.listen_port
+        with self._lock:
+            old_host, old_port = self.listen_host, self.listen_port
+            old_sock = self._server_sock
+            if (host, port) == (old_host, old_port):
+                return True
+            self.listen_host, self.listen_port = host, port
+            if old_sock is None:
+                return True
+            try:
+                self._server_sock = self._create_listener()
+            except OSError as e:
+                print(f"Failed to rebind proxy to {host}:{port}: {e}")
+                self.listen_host, self.listen_port = old_host, old_port
+                return False
+        self._close_listener(old_sock)
         self._notify_status()
+        return True
 
-    def stop(self) -> None:
+    def stop(self, drain_timeout: float = 0.0) -> None:
+        # Stop accepting, give live sessions up to drain_timeout seconds to
+        # finish on their own, then close whatever is left.
         self._stop_event.set()
         with self._lock:
             if self._server_sock:
-                try:
-                    self._server_sock.close()
-                except OSError:
-                    pass
+                self._close_listener(self._server_sock)
                 self._server_sock = None
         if self._accept_thread:
             self._accept_thread.join(timeout=2)
+        self._drain(drain_timeout)
+        if self._status_thread:
+            self._status_thread.join(timeout=2)
+        self._backend_pool.stop()
         self._notify_status()
 
     def _accept_loop(self) -> None:
         while not self._stop_event.is_set():
+            server_sock = self._server_sock
+            if not server_sock:
+                break
             try:
-                if not self._server_sock:
-                    break
-                client_sock, addr = self._server_sock.accept()
+                client_sock, addr = server_sock.accept()
             except OSError:
-                break
+                # A rebind closed the old listener: carry on with the new one
+                if self._stop_event.is_set() or self._server_sock is server_sock:
+                    break
+                continue
             except Exception:
                 continue
-            
+
+            # Refuse over-limit clients right here, before they cost a thread
+            if self._admission.admit(addr[0]):
+                reject_socket(client_sock)
+                self._notify_status()
+                continue
+
             threading.Thread(
                 target=self._handle_client, args=(client_sock, addr), daemon=True
             ).start()
 
-    def _handle_client(self, client_sock: socket.socket, addr) -> None:
+    def _drain(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        with self._sessions_changed:
+            while self._sessions:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._sessions_changed.wait(remaining)
+            leftover = [s.reap for s in self._sessions if s.reap]
+        for reap in leftover:
+            reap()
+        # Closed sockets make the session threads return; wait for them to
+        # deregister so none outlive the server
+        deadline = time.monotonic() + 2
+        with self._sessions_changed:
+            while self._sessions:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._sessions_changed.wait(remaining)
+
+    def list_sessions(self) -> List[SessionInfo]:
+        with self._lock:
+            sessions = list(self._sessions)
+        return [s.info() for s in sessions]
+
+    def _open_connection(self, addr) -> Session:
+        session = Session(addr)
         with self._lock:
-            self._active_connections += 1
+            self._sessions.add(session)
+        self._notify_status()
+        return session
+
+    def _close_connection(self, session: Session) -> None:
+        with self._sessions_changed:
+            self._sessions.discard(session)
+            session.reap = None
+            closed = self._closed_traffic
+            closed[0] += session.up.bytes
+            closed[1] += session.down.bytes
+            closed[2] += session.up.recvs
+            closed[3] += session.down.recvs
+            self._sessions_changed.notify_all()
         self._notify_status()
+
+    def _traffic_totals(self) -> List[int]:
+        with self._lock:
+            totals = list(self._closed_traffic)
+            for stats in self._sessions:
+                totals[0] += stats.up.bytes
+                totals[1] += stats.down.bytes
+                totals[2] += stats.up.recvs
+                totals[3] += stats.down.recvs
+        return totals
+
+    def _handle_client(self, client_sock: socket.socket, addr) -> None:
+        stats = self._open_connection(addr)
+        # Until the relay starts, closing the session means unblocking
+        # whatever is waiting on the client
+        stats.reap = lambda: _shutdown_socket(client_sock)
         backend_sock: Optional[socket.socket] = None
+        pending = True
+        counted: Optional[NodeInfo] = None
         try:
-            node = self.node_manager.get_current_node()
-            if not node or not node.reachable:
-                # Try to detect if it's reachable just in case it wasn't checked recently?
-                # For now, just close if marked unreachable or None
+            candidates = self._backend_candidates()
+            if not candidates:
+                # No usable node (none selected, or all unreachable)
                 client_sock.close()
                 return
+            node = candidates[0]
+            # Count the session against its node from the start, so a burst
+            # of new clients does not all pick the same least-loaded node
+            counted = node
+            stats.node = node
+            self._balancer.opened(node)
+
+            apply_socket_profile(client_sock, self._profile_for(node))
+            initial = b""
+            fill = False
+            if self.status_cache is not None:
+                served, initial, fill = self._serve_status_locally(client_sock, node)
+                if served:
+                    return
             
-            # Connect to backend
-            backend_sock = socket.create_connection((node.ip, node.port), timeout=5)
-            self._relay(client_sock, backend_sock)
+            # Connect to backend, preferring an already-established pooled socket
+            backend_sock = self._backend_pool.acquire(node)
+            if backend_sock is None:
+                backend_sock, node = self._connect_backend(candidates)
+            if node is not counted:
+                self._balancer.closed(counted)
+                self._balancer.opened(node)
+                counted = node
+                stats.node = node
+            apply_socket_profile(backend_sock, self._profile_for(node))
+            if initial:
+                # Replay what was read while looking for a status request
+                backend_sock.sendall(initial)
+                stats.up.bytes += len(initial)
+                stats.up.recvs += 1
+            if fill:
+                self._capture_status(backend_sock, client_sock, node, stats)
+            self._admission.connected()
+            pending = False
+            self._relay(client_sock, backend_sock, stats)
         except Exception:
             pass
         finally:
@@ -103,42 +370,151 @@ class ProxyServer:
                     backend_sock.close()
                 except OSError:
                     pass
-            with self._lock:
-                self._active_connections -= 1
-            self._notify_status()
+            self._balancer.closed(counted)
+            self._admission.release(addr[0], pending)
+            self._close_connection(stats)
 
-    def _relay(self, c: socket.socket, s: socket.socket) -> None:
-        def forward(src: socket.socket, dst: socket.socket) -> None:
+    def _serve_status_locally(self, client_sock: socket.socket, node: NodeInfo) -> Tuple[bool, bytes, bool]:
+        # Returns (handled, bytes to replay to the backend, whether to cache
+        # the backend's status response). Server-list pings are answered
+        # from the status cache without touching the backend.
+        responder = StatusResponder(self.status_cache, node.ip, node.port)
+        client_sock.settimeout(STATUS_READ_TIMEOUT)
+        try:
+            while True:
+                decision, reply = responder.feed(client_sock.recv(4096))
+                if reply:
+                    client_sock.sendall(reply)
+                if decision == StatusResponder.PASS:
+                    return False, responder.buffer, responder.fill
+                if decision == StatusResponder.DONE:
+                    return True, b"", False
+        except OSError:
+            return True, b"", False
+        finally:
+            if responder.served:
+                with self._lock:
+                    self._status_pings_served += 1
             try:
-                while True:
-                    data = src.recv(4096)
-                    if not data:
-                        break
-                    dst.sendall(data)
+                client_sock.settimeout(None)
             except OSError:
                 pass
-            finally:
-                try:
-                    dst.shutdown(socket.SHUT_WR)
-                except OSError:
-                    pass
 
-        t1 = threading.Thread(target=forward, args=(c, s), daemon=True)
-        t2 = threading.Thread(target=forward, args=(s, c), daemon=True)
+    def _capture_status(
+        self, backend_sock: socket.socket, client_sock: socket.socket, node: NodeInfo, stats: ConnectionStats
+    ) -> None:
+        # Forwards the backend's answer to a relayed status request and keeps
+        # a copy in the cache; the relay takes over afterwards (ping/pong).
+        capture = StatusCapture(self.status_cache, node.ip, node.port)
+        backend_sock.settimeout(STATUS_READ_TIMEOUT)
+        try:
+            done = False
+            while not done:
+                data = backend_sock.recv(65536)
+                done = capture.feed(data)
+                if data:
+                    client_sock.sendall(data)
+                    stats.down.bytes += len(data)
+                    stats.down.recvs += 1
+        except socket.timeout:
+            pass
+        finally:
+            backend_sock.settimeout(None)
+
+    def _profile_for(self, node: NodeInfo) -> Dict[str, Any]:
+        # Config mapping by hostname wins over the node's own hint, which
+        # wins over the global profile.
+        name = (
+            self.node_socket_profiles.get(node.hostname)
+            or node.socket_profile
+            or self.socket_profile
+        )
+        return resolve_profile(name, self.socket_profiles)
+
+    def _backend_candidates(self) -> List[NodeInfo]:
+        # Selected (or balanced) node first, then failover / race
+        # alternatives. Nodes that keep failing to connect are skipped while
+        # they are suspect, unless that would leave nothing to try.
+        want = max(1, self.connect_race_count, self.connect_failover_attempts + 1)
+        fetch = want * 2
+        if self._balancer.policy != POLICY_NONE:
+            fetch = max(fetch, BALANCE_CANDIDATES)
+        nodes = self.node_manager.get_candidate_nodes(fetch)
+        healthy = [n for n in nodes if not self._health.is_suspect(n)]
+        return self._balancer.order(healthy or nodes)[:want]
+
+    def _connect_timeout(self, node: NodeInfo) -> float:
+        # A multiple of the node's measured RTT, so a dead node costs a
+        # fraction of a second instead of the full maximum.
+        if node.latency_ms is None:
+            return self.connect_timeout_max
+        timeout = node.latency_ms / 1000.0 * self.connect_timeout_rtt_multiplier
+        return min(self.connect_timeout_max, max(self.connect_timeout_floor, timeout))
+
+    def _connect_backend(self, candidates: List[NodeInfo]) -> Tuple[socket.socket, NodeInfo]:
+        last_error: Optional[OSError] = None
+        remaining = list(candidates)
+        if self.connect_race_count > 1 and len(remaining) > 1:
+            racers = remaining[:self.connect_race_count]
+            remaining = remaining[self.connect_race_count:]
+            try:
+                sock, node = race_connect(
+                    racers,
+                    stagger=self.connect_race_stagger,
+                    timeout=max(self._connect_timeout(n) for n in racers),
+                    on_failure=self._health.failure,
+                )
+                self._health.success(node)
+                return sock, node
+            except OSError as e:
+                last_error = e
+        for node in remaining:
+            try:
+                sock = socket.create_connection((node.ip, node.port), timeout=self._connect_timeout(node))
+            except OSError as e:
+                last_error = e
+                self._health.failure(node)
+                continue
+            self._health.success(node)
+            # The connect timeout must not leak into the relay: a silent backend
+            # would otherwise abort the session, and splice() needs blocking fds.
+            sock.settimeout(None)
+            return sock, node
+        raise last_error or OSError("no backend node available")
+
+    def _relay(self, c: socket.socket, s: socket.socket, stats: ConnectionStats) -> None:
+        forward = get_forwarder(self.relay_mode)
+        pool = self._buffer_pool
+
+        def reap() -> None:
+            # shutdown() wakes both forward threads out of recv / splice
+            _shutdown_socket(c)
+            _shutdown_socket(s)
+
+        stats.reap = reap
+        t1 = threading.Thread(target=forward, args=(c, s, pool, stats.up), daemon=True)
+        t2 = threading.Thread(target=forward, args=(s, c, pool, stats.down), daemon=True)
         t1.start()
         t2.start()
         t1.join()
         t2.join()
 
     def _notify_status(self) -> None:
-        if not self.on_status:
-            return
+        # Coalesced by the event bus; the status is only built on delivery
+        self._events.publish(TOPIC_STATUS, factory=self._build_status)
+
+    def _build_status(self) -> ProxyStatus:
         with self._lock:
             running = self._server_sock is not None
-            active = self._active_connections
+            active = len(self._sessions)
             uptime = 0
             if self._start_time and running:
                 uptime = int(time.time() - self._start_time)
+            bytes_up, bytes_down, recvs_up, recvs_down = self._traffic_totals()
+            rate_up, rate_down = self._rate_meter.sample(bytes_up, bytes_down)
+            status_pings_served = self._status_pings_served
+            reaped_sessions = self._reaped_sessions
+        rejected = self._admission.rejected_counts()
         
         node: Optional[NodeInfo] = self.node_manager.get_current_node()
         latency = node.latency_ms if node else None
@@ -150,5 +526,15 @@ class ProxyServer:
             uptime_seconds=uptime,
             active_connections=active,
             current_latency_ms=latency,
+            bytes_up=bytes_up,
+            bytes_down=bytes_down,
+            recv_calls_up=recvs_up,
+            recv_calls_down=recvs_down,
+            rate_up_bps=rate_up,
+            rate_down_bps=rate_down,
+            status_pings_served=status_pings_served,
+            rejected_connections=sum(rejected.values()),
+            rejected_by_reason=rejected,
+            reaped_sessions=reaped_sessions,
         )
-        self.on_status(status)
+        return status
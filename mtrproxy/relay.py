@@ -0,0 +1,124 @@
+import os
+import socket
+import sys
+import threading
+from typing import List, Optional
+
+from .traffic import TrafficCounter
+
+# os.splice() is Linux-only (Python 3.10+); everywhere else we copy through
+# userspace.
+SPLICE_AVAILABLE = sys.platform.startswith("linux") and hasattr(os, "splice")
+
+RELAY_MODES = ("auto", "copy", "splice")
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+class BufferPool:
+    # Relay buffers are taken once per connection direction and reused, so
+    # the hot loop does recv_into() without allocating per chunk.
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE, max_free: int = 256):
+        self.buffer_size = max(1024, int(buffer_size))
+        self.max_free = max_free
+        self._free: List[bytearray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return bytearray(self.buffer_size)
+
+    def release(self, buf: bytearray) -> None:
+        if len(buf) != self.buffer_size:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buf)
+
+
+def resolve_relay_mode(mode: str) -> str:
+    if mode == "splice" and not SPLICE_AVAILABLE:
+        return "copy"
+    if mode == "auto":
+        return "splice" if SPLICE_AVAILABLE else "copy"
+    if mode not in RELAY_MODES:
+        return "copy"
+    return mode
+
+
+def _shutdown_write(dst: socket.socket) -> None:
+    try:
+        dst.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+
+
+def forward_copy(
+    src: socket.socket,
+    dst: socket.socket,
+    pool: Optional[BufferPool] = None,
+    counter: Optional[TrafficCounter] = None,
+) -> None:
+    if counter is None:
+        counter = TrafficCounter()
+    buf = pool.acquire() if pool else bytearray(DEFAULT_BUFFER_SIZE)
+    view = memoryview(buf)
+    try:
+        while True:
+            n = src.recv_into(buf)
+            if not n:
+                break
+            counter.bytes += n
+            counter.recvs += 1
+            dst.sendall(view[:n])
+    except OSError:
+        pass
+    finally:
+        view.release()
+        if pool:
+            pool.release(buf)
+        _shutdown_write(dst)
+
+
+def forward_splice(
+    src: socket.socket,
+    dst: socket.socket,
+    pool: Optional[BufferPool] = None,
+    counter: Optional[TrafficCounter] = None,
+) -> None:
+    # socket -> pipe -> socket entirely inside the kernel, so the payload
+    # never becomes a Python bytes object.
+    try:
+        pipe_r, pipe_w = os.pipe()
+    except OSError:
+        forward_copy(src, dst, pool, counter)
+        return
+    if counter is None:
+        counter = TrafficCounter()
+    chunk = pool.buffer_size if pool else DEFAULT_BUFFER_SIZE
+    src_fd = src.fileno()
+    dst_fd = dst.fileno()
+    try:
+        while True:
+            n = os.splice(src_fd, pipe_w, chunk, flags=os.SPLICE_F_MOVE)
+            if n == 0:
+                break
+            counter.bytes += n
+            counter.recvs += 1
+            while n > 0:
+                n -= os.splice(pipe_r, dst_fd, n, flags=os.SPLICE_F_MOVE)
+    except OSError:
+        pass
+    finally:
+        os.close(pipe_r)
+        os.close(pipe_w)
+        _shutdown_write(dst)
+
+
+def get_forwarder(mode: str):
+    if resolve_relay_mode(mode) == "splice":
+        return forward_splice
+    return forward_copy
@@ -0,0 +1,102 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .types import NodeInfo
+
+Endpoint = Tuple[str, int]
+
+# Failures beyond this no longer lengthen the interval (2**16 x the base is
+# far past any sensible max_backoff), so the count cannot grow unbounded.
+MAX_FAILURE_EXPONENT = 16
+
+
+class ProbeScheduler:
+    # Decides which endpoints the background loop probes on each tick.
+    #   - the current node and the next `hot_count` best-ranked endpoints
+    #     are probed every `hot_interval` seconds, the rest every
+    #     `cold_interval` (detect_interval_seconds)
+    #   - each consecutive failure doubles an endpoint's interval, up to
+    #     `max_backoff` seconds
+    #   - a token bucket caps probes at `rate_per_second` overall, so a
+    #     large list is spread out instead of competing with relay traffic;
+    #     when over budget, hot endpoints go first, then the most overdue
+
+    def __init__(
+        self,
+        rate_per_second: float = 20.0,
+        hot_count: int = 3,
+        hot_interval: float = 10.0,
+        max_backoff: float = 600.0,
+    ):
+        self.rate_per_second = rate_per_second
+        self.hot_count = hot_count
+        self.hot_interval = hot_interval
+        self.max_backoff = max_backoff
+        # endpoint -> (monotonic time of last probe, consecutive failures)
+        self._state: Dict[Endpoint, Tuple[float, int]] = {}
+        self._tokens = max(1.0, rate_per_second)
+        self._refilled_at: Optional[float] = None
+
+    def record(self, endpoint: Endpoint, reachable: bool, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
+        failures = 0 if reachable else min(MAX_FAILURE_EXPONENT, self._state.get(endpoint, (now, 0))[1] + 1)
+        self._state[endpoint] = (now, failures)
+
+    def _refill(self, now: float) -> None:
+        if self._refilled_at is not None:
+            self._tokens += (now - self._refilled_at) * self.rate_per_second
+        # At most one second's worth of burst
+        self._tokens = min(self._tokens, max(1.0, self.rate_per_second))
+        self._refilled_at = now
+
+    def take_due(
+        self,
+        ranked: List[NodeInfo],
+        cold_interval: float,
+        now: Optional[float] = None,
+        current: Optional[NodeInfo] = None,
+    ) -> List[NodeInfo]:
+        # `ranked` is every node, best first (the current node may lead).
+        # Returns the nodes to probe now (all nodes of each chosen endpoint).
+        if now is None:
+            now = time.monotonic()
+        self._refill(now)
+
+        groups: Dict[Endpoint, List[NodeInfo]] = {}
+        for node in ranked:
+            groups.setdefault((node.ip, node.port), []).append(node)
+        for endpoint in list(self._state):
+            if endpoint not in groups:
+                del self._state[endpoint]
+
+        current_endpoint = (current.ip, current.port) if current else None
+        due = []
+        others = 0
+        for endpoint in groups:
+            # The current endpoint is always hot, plus the hot_count best others
+            if endpoint == current_endpoint:
+                hot = True
+            else:
+                hot = others < self.hot_count
+                others += 1
+            state = self._state.get(endpoint)
+            if state is None:
+                due.append((not hot, -float("inf"), endpoint))
+                continue
+            last, failures = state
+            interval = self.hot_interval if hot else cold_interval
+            if failures:
+                interval = min(self.max_backoff, interval * 2 ** min(failures, MAX_FAILURE_EXPONENT))
+            overdue = now - last - interval
+            if overdue >= 0:
+                due.append((not hot, -overdue, endpoint))
+        due.sort()
+
+        budget = int(self._tokens)
+        chosen = due[:budget]
+        self._tokens -= len(chosen)
+        result: List[NodeInfo] = []
+        for _, _, endpoint in chosen:
+            result.extend(groups[endpoint])
+        return result
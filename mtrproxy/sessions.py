@@ -0,0 +1,29 @@
+import time
+from typing import Optional, Tuple
+
+from .traffic import ConnectionStats
+from .types import NodeInfo, SessionInfo
+
+
+class Session(ConnectionStats):
+    # One client connection from accept to close. The proxy keeps live
+    # sessions in a set, so registering and removing one is O(1) and the
+    # hot path never scans the table. `node` is filled in once the backend
+    # is known (and updated if failover lands elsewhere).
+    __slots__ = ("client", "node", "started_at")
+
+    def __init__(self, client: Tuple[str, int]):
+        super().__init__()
+        self.client = client
+        self.node: Optional[NodeInfo] = None
+        self.started_at = time.time()
+
+    def info(self) -> SessionInfo:
+        return SessionInfo(
+            client_ip=self.client[0],
+            client_port=self.client[1],
+            node=self.node.hostname if self.node else None,
+            started_at=self.started_at,
+            bytes_up=self.up.bytes,
+            bytes_down=self.down.bytes,
+        )
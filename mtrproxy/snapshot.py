@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Bumped whenever the layout changes; older snapshots are ignored
+SNAPSHOT_VERSION = 2
+
+
+def save_snapshot(path: Path, data: Dict[str, Any]) -> None:
+    # Written to a temp file in the same directory, fsynced, then renamed
+    # over the old snapshot, so a crash leaves either the old file or the
+    # new one, never a truncated mix.
+    payload = dict(data, snapshot_version=SNAPSHOT_VERSION)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    # None if there is no usable snapshot
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("snapshot_version") != SNAPSHOT_VERSION:
+        return None
+    return data
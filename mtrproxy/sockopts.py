@@ -0,0 +1,78 @@
+import socket
+from typing import Any, Dict, Optional
+
+# macOS names the idle option TCP_KEEPALIVE
+_TCP_KEEPIDLE = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+
+# Named socket option sets applied to both legs of every relayed connection.
+#   nodelay   - disable Nagle so small game packets go out immediately
+#   quickack  - Linux only; ACK immediately instead of delaying. The kernel
+#               may drop back to delayed ACKs later, so this mostly helps
+#               the start of a session.
+#   keepalive - enable kernel TCP keepalive
+#   keepalive_idle / keepalive_interval / keepalive_count - seconds of
+#               silence before the first probe, seconds between probes, and
+#               unanswered probes before the kernel drops the connection
+#               (OS defaults are two hours idle on most systems)
+#   sndbuf / rcvbuf - kernel buffer sizes in bytes (None = OS default,
+#               which keeps the kernel's auto-tuning)
+SOCKET_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "low-latency": {
+        "nodelay": True,
+        "quickack": True,
+        "keepalive": True,
+        "keepalive_idle": 60,
+        "keepalive_interval": 10,
+        "keepalive_count": 6,
+    },
+    "bulk": {
+        "nodelay": False,
+        "keepalive": True,
+        "keepalive_idle": 60,
+        "keepalive_interval": 10,
+        "keepalive_count": 6,
+        "sndbuf": 1 << 20,
+        "rcvbuf": 1 << 20,
+    },
+}
+
+
+def resolve_profile(name: Optional[str], custom: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    # Profiles from config override (or extend) the built-in ones key by key.
+    name = name or "default"
+    profile = dict(SOCKET_PROFILES.get(name, {}))
+    if custom and name in custom:
+        profile.update(custom[name])
+    return profile
+
+
+def _set(sock: socket.socket, level: int, opt: Optional[int], value: int) -> None:
+    if opt is None:
+        return
+    try:
+        sock.setsockopt(level, opt, value)
+    except OSError:
+        pass
+
+
+def apply_socket_profile(sock: socket.socket, profile: Dict[str, Any]) -> None:
+    if not profile:
+        return
+    if "nodelay" in profile:
+        _set(sock, socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if profile["nodelay"] else 0)
+    if profile.get("quickack"):
+        _set(sock, socket.IPPROTO_TCP, getattr(socket, "TCP_QUICKACK", None), 1)
+    if "keepalive" in profile:
+        _set(sock, socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1 if profile["keepalive"] else 0)
+    if profile.get("keepalive"):
+        if profile.get("keepalive_idle"):
+            _set(sock, socket.IPPROTO_TCP, _TCP_KEEPIDLE, int(profile["keepalive_idle"]))
+        if profile.get("keepalive_interval"):
+            _set(sock, socket.IPPROTO_TCP, getattr(socket, "TCP_KEEPINTVL", None), int(profile["keepalive_interval"]))
+        if profile.get("keepalive_count"):
+            _set(sock, socket.IPPROTO_TCP, getattr(socket, "TCP_KEEPCNT", None), int(profile["keepalive_count"]))
+    if profile.get("sndbuf"):
+        _set(sock, socket.SOL_SOCKET, socket.SO_SNDBUF, int(profile["sndbuf"]))
+    if profile.get("rcvbuf"):
+        _set(sock, socket.SOL_SOCKET, socket.SO_RCVBUF, int(profile["rcvbuf"]))
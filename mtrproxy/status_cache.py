@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .mcproto import (
+    LEGACY_PING,
+    PACKET_PING,
+    PACKET_STATUS,
+    STATE_STATUS,
+    Handshake,
+    decode_string,
+    pack_packet,
+    pack_string,
+    parse_handshake,
+    split_packet,
+)
+
+
+class StatusCache:
+    # Short-lived copy of each node's server-list status JSON, stored as the
+    # ready-to-send status response packet so a hit costs one sendall().
+    # Filled by latency probes and by status responses relayed on a miss;
+    # the TTL should outlast the hot probe interval so the current node's
+    # entry stays warm between probes.
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, int], Tuple[float, str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, ip: str, port: int, status_json: str) -> None:
+        packet = pack_packet(PACKET_STATUS, pack_string(status_json))
+        with self._lock:
+            self._entries[(ip, port)] = (time.monotonic(), status_json, packet)
+
+    def get_json(self, ip: str, port: int) -> Optional[str]:
+        entry = self._get(ip, port)
+        return entry[1] if entry else None
+
+    def get_response(self, ip: str, port: int) -> Optional[bytes]:
+        entry = self._get(ip, port)
+        return entry[2] if entry else None
+
+    def _get(self, ip: str, port: int) -> Optional[Tuple[float, str, bytes]]:
+        with self._lock:
+            entry = self._entries.get((ip, port))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[(ip, port)]
+                return None
+            return entry
+
+
+class StatusResponder:
+    # Sans-IO reader for the first packets of a client connection. Feed it
+    # whatever the client sends; it answers status requests and ping/pong
+    # from the cache, and tells the caller to pass everything else (login,
+    # legacy 0xFE pings, cache misses, unparseable data) through untouched.
+    # On a miss it waits for the status request itself and sets `fill`, so
+    # the caller can cache the backend's answer with StatusCapture.
+    MORE = "more"
+    PASS = "pass"
+    DONE = "done"
+
+    def __init__(self, cache: StatusCache, ip: str, port: int):
+        self.cache = cache
+        self.ip = ip
+        self.port = port
+        self.buffer = b""
+        self.served = False
+        self._handshake: Optional[Handshake] = None
+        self._pos = 0
+        self._response: Optional[bytes] = None
+        self.fill = False
+
+    def feed(self, data: bytes) -> Tuple[str, bytes]:
+        # Returns (decision, bytes to send back to the client).
+        if not data:
+            return self.DONE, b""
+        self.buffer += data
+        if self._handshake is None:
+            if self.buffer[0] == LEGACY_PING:
+                return self.PASS, b""
+            try:
+                parsed = parse_handshake(self.buffer)
+            except ValueError:
+                return self.PASS, b""
+            if parsed is None:
+                return self.MORE, b""
+            self._handshake, self._pos = parsed
+            if self._handshake.next_state != STATE_STATUS:
+                return self.PASS, b""
+            self._response = self.cache.get_response(self.ip, self.port)
+        if self._response is None:
+            try:
+                pkt = split_packet(self.buffer, self._pos)
+            except ValueError:
+                return self.PASS, b""
+            if pkt is None:
+                return self.MORE, b""
+            self.fill = pkt[0] == PACKET_STATUS
+            return self.PASS, b""
+
+        reply = b""
+        while True:
+            try:
+                pkt = split_packet(self.buffer, self._pos)
+            except ValueError:
+                return self.DONE, reply
+            if pkt is None:
+                return self.MORE, reply
+            packet_id, payload, self._pos = pkt
+            if packet_id == PACKET_STATUS:
+                reply += self._response
+                self.served = True
+            elif packet_id == PACKET_PING:
+                return self.DONE, reply + pack_packet(PACKET_PING, payload)
+            else:
+                return self.DONE, reply
+
+
+class StatusCapture:
+    # Sans-IO watcher for what a backend sends back after a status request
+    # that missed the cache. The caller forwards every chunk to the client
+    # as usual and feeds it here too; the status response is stored so the
+    # next server-list ping is answered locally, even without probes.
+
+    def __init__(self, cache: StatusCache, ip: str, port: int):
+        self.cache = cache
+        self.ip = ip
+        self.port = port
+        self.buffer = b""
+
+    def feed(self, data: bytes) -> bool:
+        # True once there is nothing more to watch for
+        if not data:
+            return True
+        self.buffer += data
+        try:
+            pkt = split_packet(self.buffer)
+        except ValueError:
+            return True
+        if pkt is None:
+            return False
+        packet_id, payload, _ = pkt
+        if packet_id == PACKET_STATUS:
+            try:
+                self.cache.put(self.ip, self.port, decode_string(payload))
+            except ValueError:
+                pass
+        return True
@@ -0,0 +1,96 @@
+import time
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+
+from .types import NodeInfo, SwitchRecord
+
+REASON_MANUAL = "manual"
+REASON_INITIAL = "initial"
+REASON_UNREACHABLE = "current unreachable"
+
+
+class SwitchPolicy:
+    # Hysteresis for automatic node selection, so two equivalent nodes do
+    # not trade places on every probe round. A challenger replaces the
+    # current node only if
+    #   - it is faster by at least `min_improvement_ms` AND by at least
+    #     `min_improvement_ratio` of the current node's latency,
+    #   - the current node has been selected for `min_dwell_seconds`, and
+    #   - it has kept winning for `confirm_rounds` rounds in a row, where a
+    #     round only counts if it brought a new sample for either node.
+    # An unreachable (or missing) current node is replaced straight away.
+    # Latencies are the nodes' effective (jitter/loss adjusted) values.
+
+    def __init__(
+        self,
+        min_improvement_ms: float = 10.0,
+        min_improvement_ratio: float = 0.15,
+        min_dwell_seconds: float = 60.0,
+        confirm_rounds: int = 3,
+        history_size: int = 100,
+    ):
+        self.min_improvement_ms = min_improvement_ms
+        self.min_improvement_ratio = min_improvement_ratio
+        self.min_dwell_seconds = min_dwell_seconds
+        self.confirm_rounds = max(1, confirm_rounds)
+        self._selected_at = 0.0
+        self._challenger: Optional[str] = None
+        self._wins = 0
+        self.history: Deque[SwitchRecord] = deque(maxlen=history_size)
+
+    def evaluate(
+        self,
+        current: Optional[NodeInfo],
+        best: Optional[NodeInfo],
+        best_latency: float,
+        current_latency: float,
+        probed: Set[Tuple[str, int]],
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        # Returns the reason to switch to `best`, or None to stay.
+        if now is None:
+            now = time.monotonic()
+        if best is None or (current is not None and best.hostname == current.hostname):
+            self._reset()
+            return None
+        if current is None:
+            return REASON_INITIAL
+        if not current.reachable:
+            return REASON_UNREACHABLE
+
+        gain = current_latency - best_latency
+        if gain < self.min_improvement_ms or gain < current_latency * self.min_improvement_ratio:
+            self._reset()
+            return None
+
+        fresh = (current.ip, current.port) in probed or (best.ip, best.port) in probed
+        if best.hostname != self._challenger:
+            self._challenger = best.hostname
+            self._wins = 1
+        elif fresh:
+            self._wins += 1
+
+        if self._wins < self.confirm_rounds:
+            return None
+        if now - self._selected_at < self.min_dwell_seconds:
+            return None
+        return f"faster by {gain:.0f} ms ({gain / current_latency:.0%}) for {self._wins} rounds"
+
+    def note_selected(self, now: Optional[float] = None) -> None:
+        # Starts the dwell period for a node selected without a switch,
+        # e.g. one restored from the snapshot at startup
+        self._selected_at = time.monotonic() if now is None else now
+        self._reset()
+
+    def record(self, from_node: Optional[str], to_node: str, reason: str, now: Optional[float] = None) -> SwitchRecord:
+        self.note_selected(now)
+        entry = SwitchRecord(time.time(), from_node, to_node, reason)
+        self.history.append(entry)
+        return entry
+
+    def _reset(self) -> None:
+        self._challenger = None
+        self._wins = 0
+
+    def recent(self) -> List[SwitchRecord]:
+        return list(self.history)
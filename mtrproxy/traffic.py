@@ -0,0 +1,63 @@
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+
+class TrafficCounter:
+    # One direction of one connection. Only the relay thread (or coroutine)
+    # for that direction writes it, so plain attribute increments are enough
+    # and the hot loop never takes a lock; readers tolerate a stale value.
+    __slots__ = ("bytes", "recvs")
+
+    def __init__(self):
+        self.bytes = 0
+        self.recvs = 0
+
+
+class ConnectionStats:
+    # "up" is client -> backend, "down" is backend -> client. `reap` is set
+    # by the engine once the session is relaying; calling it tears both
+    # legs down so blocked relay threads (or coroutines) return.
+    __slots__ = ("up", "down", "reap", "_last_total", "_last_active")
+
+    def __init__(self):
+        self.up = TrafficCounter()
+        self.down = TrafficCounter()
+        self.reap: Optional[Callable[[], None]] = None
+        self._last_total = 0
+        self._last_active = time.monotonic()
+
+    def idle_for(self, now: float) -> float:
+        # Seconds since bytes last moved in either direction, as seen by
+        # successive calls (the reaper polls this once a second).
+        total = self.up.bytes + self.down.bytes
+        if total != self._last_total:
+            self._last_total = total
+            self._last_active = now
+            return 0.0
+        return now - self._last_active
+
+
+class RateMeter:
+    # Rolling throughput over the last `window` seconds from cumulative
+    # byte totals.
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self._samples: Deque[Tuple[float, int, int]] = deque()
+
+    def reset(self) -> None:
+        self._samples.clear()
+
+    def sample(self, bytes_up: int, bytes_down: int, now: Optional[float] = None) -> Tuple[float, float]:
+        if now is None:
+            now = time.monotonic()
+        samples = self._samples
+        samples.append((now, bytes_up, bytes_down))
+        while len(samples) > 2 and now - samples[1][0] >= self.window:
+            samples.popleft()
+        t0, up0, down0 = samples[0]
+        elapsed = now - t0
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (bytes_up - up0) / elapsed, (bytes_down - down0) / elapsed
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 
 @dataclass
@@ -12,9 +12,53 @@ class NodeInfo:
     priority: int = 100
     motd: Optional[str] = None
     online_count: int = 0
+    # Smoothed (EWMA) probe latency; see NodeManager._fill_latency_stats
     latency_ms: Optional[float] = None
+    last_sample_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    loss_rate: float = 0.0
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    # What node selection ranks by: latency adjusted for jitter and loss
+    effective_latency_ms: Optional[float] = None
+    # Breakdown of the last successful probe
+    connect_ms: Optional[float] = None
+    status_ms: Optional[float] = None
+    rtt_ms: Optional[float] = None
     reachable: bool = False
     status: str = "unknown"
+    # Optional socket profile name for connections to this node
+    socket_profile: Optional[str] = None
+    # UDP port for Bedrock/Geyser clients, if the node accepts them
+    bedrock_port: Optional[int] = None
+
+
+@dataclass
+class ProbeTiming:
+    # One probe, in ms. latency_ms is what feeds the node's statistics: the
+    # ping/pong RTT when available, otherwise the status response time.
+    latency_ms: float
+    connect_ms: float
+    status_ms: float
+    rtt_ms: Optional[float] = None
+
+
+@dataclass
+class SwitchRecord:
+    timestamp: float
+    from_node: Optional[str]
+    to_node: str
+    reason: str
+
+
+@dataclass
+class SessionInfo:
+    client_ip: str
+    client_port: int
+    node: Optional[str]
+    started_at: float
+    bytes_up: int
+    bytes_down: int
 
 
 @dataclass
@@ -25,3 +69,17 @@ class ProxyStatus:
     uptime_seconds: int
     active_connections: int
     current_latency_ms: Optional[float]
+    # Relay traffic since start; "up" is client -> backend
+    bytes_up: int = 0
+    bytes_down: int = 0
+    recv_calls_up: int = 0
+    recv_calls_down: int = 0
+    rate_up_bps: float = 0.0
+    rate_down_bps: float = 0.0
+    # Server-list pings answered from the local status cache
+    status_pings_served: int = 0
+    # Clients refused by admission control, total and per limit
+    rejected_connections: int = 0
+    rejected_by_reason: Dict[str, int] = field(default_factory=dict)
+    # Sessions closed by the idle timeout
+    reaped_sessions: int = 0
@@ -0,0 +1,230 @@
+import selectors
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .types import NodeInfo
+
+# Bedrock (RakNet) datagrams stay below the path MTU, but accept anything an
+# IPv4 UDP socket can deliver.
+MAX_DATAGRAM = 65535
+
+# Kernel receive buffer for the shared listener; bursts from many clients
+# queue here while the relay thread is busy instead of being dropped.
+LISTENER_RCVBUF = 1 << 20
+
+Address = Tuple[str, int]
+
+
+class _Flow:
+    # One client address and the connected upstream socket serving it.
+    __slots__ = ("client", "upstream", "node", "last_active", "packets_up", "packets_down")
+
+    def __init__(self, client: Address, upstream: socket.socket, node: NodeInfo):
+        self.client = client
+        self.upstream = upstream
+        self.node = node
+        self.last_active = time.monotonic()
+        self.packets_up = 0
+        self.packets_down = 0
+
+
+class UdpRelayServer:
+    # Relays Bedrock/Geyser traffic (RakNet over UDP) to the selected node's
+    # bedrock_port. Every client address gets its own upstream socket, so
+    # replies map back to the client without inspecting the payload. A flow
+    # keeps its node until it expires; new flows follow node switches.
+    #
+    # Python has no recvmmsg/sendmmsg, so batching means draining up to
+    # `batch_size` datagrams per socket per wakeup with recvfrom_into() into
+    # one reused buffer: a burst costs one select() instead of one per
+    # packet, and nothing is allocated per datagram.
+
+    def __init__(
+        self,
+        listen_host: str,
+        listen_port: int,
+        node_manager,
+        flow_idle_seconds: float = 60.0,
+        max_flows: int = 4096,
+        batch_size: int = 64,
+    ):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.node_manager = node_manager
+        self.flow_idle_seconds = flow_idle_seconds
+        self.max_flows = max_flows
+        self.batch_size = max(1, batch_size)
+
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._flows: Dict[Address, _Flow] = {}
+        self._buf = bytearray(MAX_DATAGRAM)
+        self._view = memoryview(self._buf)
+
+        self.packets_up = 0
+        self.packets_down = 0
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self.dropped = 0
+        self.expired_flows = 0
+
+    def is_running(self) -> bool:
+        with self._lock:
+            return self._sock is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._sock:
+                return
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, LISTENER_RCVBUF)
+                except OSError:
+                    pass
+                sock.bind((self.listen_host, self.listen_port))
+                sock.setblocking(False)
+            except OSError as e:
+                print(f"Failed to start UDP relay: {e}")
+                return
+            self._sock = sock
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, args=(sock,), daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        with self._lock:
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+            for flow in self._flows.values():
+                flow.upstream.close()
+            self._flows.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            flows = len(self._flows)
+        return {
+            "flows": flows,
+            "packets_up": self.packets_up,
+            "packets_down": self.packets_down,
+            "bytes_up": self.bytes_up,
+            "bytes_down": self.bytes_down,
+            "dropped": self.dropped,
+            "expired_flows": self.expired_flows,
+        }
+
+    def _run(self, sock: socket.socket) -> None:
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ, None)
+        next_sweep = time.monotonic() + 1
+        try:
+            while not self._stop_event.is_set():
+                for key, _ in sel.select(timeout=0.5):
+                    if key.data is None:
+                        self._drain_clients(sock, sel)
+                    else:
+                        self._drain_upstream(sock, key.data)
+                now = time.monotonic()
+                if now >= next_sweep:
+                    self._expire(sel, now)
+                    next_sweep = now + 1
+        except OSError:
+            pass
+        finally:
+            sel.close()
+
+    def _drain_clients(self, sock: socket.socket, sel: selectors.BaseSelector) -> None:
+        view = self._view
+        for _ in range(self.batch_size):
+            try:
+                n, addr = sock.recvfrom_into(self._buf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # e.g. ICMP port unreachable reported on Windows
+                continue
+            flow = self._flows.get(addr)
+            if flow is None:
+                flow = self._open_flow(addr, sel)
+                if flow is None:
+                    self.dropped += 1
+                    continue
+            try:
+                flow.upstream.send(view[:n])
+            except OSError:
+                self.dropped += 1
+                continue
+            flow.last_active = time.monotonic()
+            flow.packets_up += 1
+            self.packets_up += 1
+            self.bytes_up += n
+
+    def _drain_upstream(self, sock: socket.socket, flow: _Flow) -> None:
+        view = self._view
+        for _ in range(self.batch_size):
+            try:
+                n = flow.upstream.recv_into(self._buf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # ICMP unreachable from the node; the flow expires on its own
+                return
+            try:
+                sock.sendto(view[:n], flow.client)
+            except OSError:
+                self.dropped += 1
+                continue
+            flow.last_active = time.monotonic()
+            flow.packets_down += 1
+            self.packets_down += 1
+            self.bytes_down += n
+
+    def _pick_node(self) -> Optional[NodeInfo]:
+        for node in self.node_manager.get_candidate_nodes(8):
+            if node.bedrock_port:
+                return node
+        return None
+
+    def _open_flow(self, addr: Address, sel: selectors.BaseSelector) -> Optional[_Flow]:
+        if self.max_flows and len(self._flows) >= self.max_flows:
+            return None
+        node = self._pick_node()
+        if node is None:
+            return None
+        upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            upstream.connect((node.ip, node.bedrock_port))
+            upstream.setblocking(False)
+        except OSError:
+            upstream.close()
+            return None
+        flow = _Flow(addr, upstream, node)
+        sel.register(upstream, selectors.EVENT_READ, flow)
+        with self._lock:
+            self._flows[addr] = flow
+        return flow
+
+    def _expire(self, sel: selectors.BaseSelector, now: float) -> None:
+        expired = [
+            flow for flow in self._flows.values()
+            if now - flow.last_active >= self.flow_idle_seconds
+        ]
+        if not expired:
+            return
+        with self._lock:
+            for flow in expired:
+                del self._flows[flow.client]
+        for flow in expired:
+            sel.unregister(flow.upstream)
+            flow.upstream.close()
+        self.expired_flows += len(expired)
@@ -0,0 +1,357 @@
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .events import TOPIC_STATUS, EventBus
+from .traffic import RateMeter
+from .types import NodeInfo, ProxyStatus, SessionInfo
+
+# Only Linux load-balances accepts across sockets sharing a port; BSD/macOS
+# accept SO_REUSEPORT but hand every connection to one socket.
+REUSEPORT_AVAILABLE = sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+
+# Per-worker counters published through shared memory, one row per worker.
+SHARED_FIELDS = (
+    "active_connections",
+    "bytes_up",
+    "bytes_down",
+    "recv_calls_up",
+    "recv_calls_down",
+    "rejected_connections",
+    "reaped_sessions",
+)
+
+# How many candidate nodes the supervisor shares with workers for racing.
+SHARED_CANDIDATES = 8
+
+# How long start() waits for every worker to report its bind; spawning
+# re-imports the application in each child, which is slow when frozen.
+WORKER_START_TIMEOUT = 15.0
+
+# Per-worker start result in the shared `started` array
+_PENDING, _LISTENING, _FAILED = 0, 1, -1
+
+
+class _SharedNodeSource:
+    # Stands in for NodeManager inside a worker: the supervisor pushes the
+    # candidate list (selected node first) over a queue and the worker's
+    # ProxyServer reads it here.
+
+    def __init__(self, node_queue):
+        self._node_queue = node_queue
+        self._current: Optional[NodeInfo] = None
+        self._candidates: List[NodeInfo] = []
+        self._lock = threading.Lock()
+        self.on_rebind: Optional[Callable[[str, int], bool]] = None
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self) -> None:
+        while True:
+            try:
+                msg = self._node_queue.get()
+            except (EOFError, OSError):
+                return
+            if msg == "stop":
+                return
+            if msg[0] == "rebind":
+                if self.on_rebind:
+                    self.on_rebind(msg[1], msg[2])
+                continue
+            with self._lock:
+                self._current, self._candidates = msg
+
+    def get_current_node(self) -> Optional[NodeInfo]:
+        with self._lock:
+            return self._current
+
+    def get_candidate_nodes(self, limit: int) -> List[NodeInfo]:
+        with self._lock:
+            return self._candidates[:max(1, limit)]
+
+
+def _worker_main(
+    index: int,
+    listen_host: str,
+    listen_port: int,
+    engine: str,
+    proxy_options: Dict[str, Any],
+    node_queue,
+    counters,
+    stop_event,
+    drain_timeout,
+    started,
+    status_cache_ttl,
+) -> None:
+    from .proxy_async import AsyncProxyServer
+    from .proxy_core import ProxyServer
+    from .status_cache import StatusCache
+
+    base = index * len(SHARED_FIELDS)
+
+    def on_status(status: ProxyStatus) -> None:
+        for i, field in enumerate(SHARED_FIELDS):
+            counters[base + i] = getattr(status, field)
+
+    cls = AsyncProxyServer if engine == "asyncio" else ProxyServer
+    nodes = _SharedNodeSource(node_queue)
+    proxy = cls(
+        listen_host,
+        listen_port,
+        nodes,
+        on_status=on_status,
+        reuse_port=True,
+        # Probes run in the supervisor, so each worker's cache is filled
+        # from the status responses it relays itself
+        status_cache=StatusCache(status_cache_ttl) if status_cache_ttl is not None else None,
+        **proxy_options,
+    )
+    nodes.on_rebind = proxy.rebind
+    if not proxy.start():
+        started[index] = _FAILED
+        return
+    started[index] = _LISTENING
+    stop_event.wait()
+    proxy.stop(drain_timeout=drain_timeout.value)
+
+
+class WorkerSupervisor:
+    # Runs N worker processes that each bind listen_host:listen_port with
+    # SO_REUSEPORT, so the kernel spreads accepts (and the relay work) across
+    # several interpreters instead of one GIL. Exposes the ProxyServer
+    # start/stop/on_status contract.
+
+    def __init__(
+        self,
+        listen_host: str,
+        listen_port: int,
+        node_manager,
+        on_status: Optional[Callable[[ProxyStatus], None]] = None,
+        workers: int = 2,
+        engine: str = "thread",
+        proxy_options: Optional[Dict[str, Any]] = None,
+        event_bus: Optional[EventBus] = None,
+        status_cache_ttl: Optional[float] = None,
+    ):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.node_manager = node_manager
+        self.on_status = on_status
+        self._events = event_bus or EventBus()
+        if on_status:
+            self._events.subscribe(TOPIC_STATUS, on_status)
+        self.workers = max(1, int(workers))
+        self.engine = engine
+        self.proxy_options = dict(proxy_options or {})
+        # None disables the status cache in the workers
+        self.status_cache_ttl = status_cache_ttl
+
+        # spawn, not fork: the parent runs Qt and several threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs: List[Any] = []
+        self._queues: List[Any] = []
+        self._counters = None
+        self._stop_event = None
+        self._drain_timeout = None
+        self._started = None
+        self._monitor_stop = threading.Event()
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+        self._start_time: Optional[float] = None
+        self._last_node_key = None
+        self._rate_meter = RateMeter()
+
+    def is_running(self) -> bool:
+        with self._lock:
+            return any(p.is_alive() for p in self._procs)
+
+    def start(self) -> bool:
+        # True once every worker is listening
+        with self._lock:
+            if any(p.is_alive() for p in self._procs):
+                return True
+            # Workers that exited on their own (e.g. lost the port) are
+            # cleaned up so this start gets a fresh set
+            self._terminate()
+            self._counters = self._ctx.Array("q", self.workers * len(SHARED_FIELDS), lock=False)
+            self._stop_event = self._ctx.Event()
+            self._drain_timeout = self._ctx.Value("d", 0.0, lock=False)
+            self._started = self._ctx.Array("b", self.workers, lock=False)
+            self._last_node_key = None
+            self._rate_meter.reset()
+            try:
+                for i in range(self.workers):
+                    q = self._ctx.Queue()
+                    p = self._ctx.Process(
+                        target=_worker_main,
+                        args=(
+                            i,
+                            self.listen_host,
+                            self.listen_port,
+                            self.engine,
+                            self.proxy_options,
+                            q,
+                            self._counters,
+                            self._stop_event,
+                            self._drain_timeout,
+                            self._started,
+                            self.status_cache_ttl,
+                        ),
+                        daemon=True,
+                    )
+                    p.start()
+                    self._queues.append(q)
+                    self._procs.append(p)
+                self._wait_started()
+            except Exception as e:
+                print(f"Failed to start proxy workers: {e}")
+                self._terminate()
+                self._notify_status()
+                return False
+            self._start_time = time.time()
+            self._push_node(force=True)
+            self._monitor_stop.clear()
+            self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor_thread.start()
+        self._notify_status()
+        return True
+
+    def _wait_started(self) -> None:
+        # Raises unless every worker reports that it is listening
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        while True:
+            states = list(self._started)
+            if _FAILED in states:
+                raise OSError(f"{states.count(_FAILED)} worker(s) could not listen on port {self.listen_port}")
+            if all(s == _LISTENING for s in states):
+                return
+            for i, p in enumerate(self._procs):
+                # Re-read: the worker may have reported just before exiting
+                if not p.is_alive() and self._started[i] != _LISTENING:
+                    raise OSError(f"worker {i} exited during startup (code {p.exitcode})")
+            if time.monotonic() >= deadline:
+                raise OSError("workers did not start in time")
+            time.sleep(0.05)
+
+    def stop(self, drain_timeout: float = 0.0) -> None:
+        self._monitor_stop.set()
+        if self._monitor_thread:
+            self._monitor_thread.join(timeout=2)
+            self._monitor_thread = None
+        with self._lock:
+            self._terminate(drain_timeout)
+        self._notify_status()
+
+    def list_sessions(self) -> List[SessionInfo]:
+        # Sessions live inside the worker processes; only their counters
+        # are shared with the supervisor, so there is no session list.
+        return []
+
+    def _terminate(self, drain_timeout: float = 0.0) -> None:
+        # Each worker drains its own sessions in parallel
+        if self._drain_timeout is not None:
+            self._drain_timeout.value = drain_timeout
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for q in self._queues:
+            try:
+                q.put("stop")
+            except (OSError, ValueError):
+                pass
+        for p in self._procs:
+            p.join(timeout=drain_timeout + 4)
+            if p.is_alive():
+                p.terminate()
+        for q in self._queues:
+            q.close()
+        self._procs = []
+        self._queues = []
+
+    def rebind(self, listen_host: Optional[str] = None, listen_port: Optional[int] = None) -> bool:
+        # Each worker swaps its own SO_REUSEPORT listener, so sessions keep
+        # running in every process. Probe-bind here first: the workers can
+        # only report failure through their (unchanged) counters.
+        host = listen_host or self.listen_host
+        port = listen_port or self.listen_port
+        with self._lock:
+            if (host, port) == (self.listen_host, self.listen_port):
+                return True
+            if self._procs:
+                probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                try:
+                    probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                    probe.bind((host, port))
+                except OSError as e:
+                    print(f"Failed to rebind proxy to {host}:{port}: {e}")
+                    return False
+                finally:
+                    probe.close()
+                for q in self._queues:
+                    try:
+                        q.put(("rebind", host, port))
+                    except (OSError, ValueError):
+                        pass
+            self.listen_host, self.listen_port = host, port
+        self._notify_status()
+        return True
+
+    def _push_node(self, force: bool = False) -> None:
+        node = self.node_manager.get_current_node()
+        candidates = self.node_manager.get_candidate_nodes(SHARED_CANDIDATES)
+        key = tuple((n.hostname, n.ip, n.port, n.reachable) for n in [node] + candidates if n)
+        if not force and key == self._last_node_key:
+            return
+        self._last_node_key = key
+        for q in self._queues:
+            try:
+                q.put((node, candidates))
+            except (OSError, ValueError):
+                pass
+
+    def _totals(self) -> tuple:
+        counters = self._counters
+        if counters is None:
+            return tuple(0 for _ in SHARED_FIELDS)
+        width = len(SHARED_FIELDS)
+        return tuple(
+            sum(counters[w * width + i] for w in range(self.workers))
+            for i in range(width)
+        )
+
+    def _monitor_loop(self) -> None:
+        # Workers publish their counters every second; re-emit status at the
+        # same pace so aggregated throughput and uptime stay current.
+        while not self._monitor_stop.wait(1):
+            with self._lock:
+                self._push_node()
+            self._notify_status()
+
+    def _notify_status(self) -> None:
+        self._events.publish(TOPIC_STATUS, factory=self._build_status)
+
+    def _build_status(self) -> ProxyStatus:
+        with self._lock:
+            running = any(p.is_alive() for p in self._procs)
+            totals = dict(zip(SHARED_FIELDS, self._totals()))
+            uptime = 0
+            if self._start_time and running:
+                uptime = int(time.time() - self._start_time)
+            rate_up, rate_down = self._rate_meter.sample(totals["bytes_up"], totals["bytes_down"])
+
+        node: Optional[NodeInfo] = self.node_manager.get_current_node()
+        latency = node.latency_ms if node else None
+
+        status = ProxyStatus(
+            running=running,
+            current_node=node,
+            listen_port=self.listen_port,
+            uptime_seconds=uptime,
+            current_latency_ms=latency,
+            rate_up_bps=rate_up,
+            rate_down_bps=rate_down,
+            **totals,
+        )
+        return status
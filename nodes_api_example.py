@@ -1,6 +1,9 @@
-from fastapi import FastAPI
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
 
 app = FastAPI()
 
@@ -11,12 +14,82 @@ class Node(BaseModel):
     port: int
 
 
-@app.get("/api/nodes", response_model=List[Node])
-def get_nodes():
-    return [
-        Node(hostname="node1", ip="1.1.1.1", port=25565),
-        Node(hostname="node2", ip="2.2.2.2", port=25565),
-    ]
+# Node list with a version counter. Every change bumps the version and is
+# logged, so clients can ask for just what changed since their version.
+NODES: Dict[str, Node] = {
+    "node1": Node(hostname="node1", ip="1.1.1.1", port=25565),
+    "node2": Node(hostname="node2", ip="2.2.2.2", port=25565),
+}
+VERSION = 1
+UPDATED_AT = formatdate(usegmt=True)
+# (version, hostname, kind) per change, kind is "added", "changed" or
+# "removed"; older entries are trimmed
+CHANGES: List[Tuple[int, str, str]] = []
+MAX_CHANGES = 1000
+
+
+def _validators() -> Dict[str, str]:
+    return {
+        "ETag": f'"nodes-{VERSION}"',
+        "Last-Modified": UPDATED_AT,
+        "X-Nodes-Version": str(VERSION),
+    }
+
+
+def _record_change(hostname: str, kind: str) -> None:
+    global VERSION, UPDATED_AT
+    VERSION += 1
+    UPDATED_AT = formatdate(usegmt=True)
+    CHANGES.append((VERSION, hostname, kind))
+    del CHANGES[:-MAX_CHANGES]
+
+
+@app.get("/api/nodes")
+def get_nodes(request: Request, since: Optional[int] = None):
+    # Plain GET returns the array as before. Conditional requests get a 304
+    # when nothing changed; ?since=<version> gets a delta object, or the
+    # full array if that version is too old to diff against.
+    headers = _validators()
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if "if-none-match" not in request.headers and request.headers.get("if-modified-since") == UPDATED_AT:
+        return Response(status_code=304, headers=headers)
+
+    oldest = CHANGES[0][0] - 1 if CHANGES else VERSION
+    if since is not None and oldest <= since <= VERSION:
+        # First change after `since` per node tells whether the client has it
+        first: Dict[str, str] = {}
+        for version, hostname, kind in CHANGES:
+            if version > since:
+                first.setdefault(hostname, kind)
+        added, changed, removed = [], [], []
+        for hostname, kind in first.items():
+            if hostname not in NODES:
+                if kind != "added":
+                    removed.append(hostname)
+            elif kind == "added":
+                added.append(NODES[hostname].dict())
+            else:
+                changed.append(NODES[hostname].dict())
+        body = {"version": VERSION, "added": added, "changed": changed, "removed": removed}
+        return JSONResponse(body, headers=headers)
+
+    return JSONResponse([n.dict() for n in NODES.values()], headers=headers)
+
+
+@app.put("/api/nodes/{hostname}")
+def put_node(hostname: str, node: Node):
+    kind = "changed" if hostname in NODES else "added"
+    NODES[hostname] = node
+    _record_change(hostname, kind)
+    return {"version": VERSION}
+
+
+@app.delete("/api/nodes/{hostname}")
+def delete_node(hostname: str):
+    if NODES.pop(hostname, None) is not None:
+        _record_change(hostname, "removed")
+    return {"version": VERSION}
 
 
 class Announcement(BaseModel):